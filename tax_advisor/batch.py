@@ -0,0 +1,98 @@
+# tax_advisor/batch.py
+
+import logging
+import os
+import argparse
+import pandas as pd
+import config
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from data_loader.loader import load_ttbr_rates, load_and_clean_data
+from core_logic.rate_index import TTBRRateIndex
+from main import process_portfolio
+from utils.profiling import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Rate index shared read-only by every portfolio handled in a worker process.
+_worker_rates: Optional[TTBRRateIndex] = None
+
+RESULT_COLUMNS = ['Name', 'Output_File', 'Status', 'Error', 'Total_Tax_Liability_INR']
+
+def _init_worker(ttbr_rates: TTBRRateIndex):
+    """Keeps the rate index, built once in the parent, for every portfolio of this worker process."""
+    global _worker_rates
+    _worker_rates = ttbr_rates
+
+def read_manifest(manifest_file: str) -> List[Dict[str, Any]]:
+    """Reads the batch manifest: one row per taxpayer with 'Name', 'Input_Dir' and 'Other_Income_INR'.
+
+    An optional 'Output_File' column overrides the default report path inside the input directory.
+    """
+    manifest_df = pd.read_csv(manifest_file)
+    missing = {'Name', 'Input_Dir', 'Other_Income_INR'} - set(manifest_df.columns)
+    if missing:
+        raise ValueError(f"Manifest '{manifest_file}' is missing columns: {', '.join(sorted(missing))}")
+    if 'Output_File' not in manifest_df.columns:
+        manifest_df['Output_File'] = None
+    manifest_df['Output_File'] = [
+        output if isinstance(output, str) and output else os.path.join(input_dir, config.OUTPUT_EXCEL_FILE)
+        for input_dir, output in zip(manifest_df['Input_Dir'], manifest_df['Output_File'])
+    ]
+    return manifest_df.to_dict('records')
+
+def _run_portfolio(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Processes one manifest entry, capturing any failure instead of raising it."""
+    result = dict(zip(RESULT_COLUMNS, [entry['Name'], entry['Output_File'], 'Fail', '', None]))
+    try:
+        load_timings = {}
+        sales_df, acq_df, quotes = load_and_clean_data(
+            os.path.join(entry['Input_Dir'], config.CAPITAL_GAINS_FILE),
+            os.path.join(entry['Input_Dir'], config.RELEASES_FILE),
+            os.path.join(entry['Input_Dir'], config.QUOTE_HISTORY_FILE),
+            engine=config.CSV_ENGINE, timings=load_timings
+        )
+        logger.debug(f"Loaded the inputs of '{entry['Name']}' in {sum(load_timings.values()):.3f}s.", extra={'portfolio': entry['Name'], 'load_timings': load_timings})
+        outcome = process_portfolio(sales_df, acq_df, quotes, _worker_rates, float(entry['Other_Income_INR']), entry['Output_File'])
+        failed_checks = [check for check, status in outcome['validation_results'].items() if status != 'Pass']
+        result.update({
+            'Status': 'Pass' if not failed_checks else 'Validation Fail',
+            'Error': ', '.join(failed_checks),
+            'Total_Tax_Liability_INR': outcome['tax_data']['total_tax_liability']
+        })
+    except Exception as e:
+        result['Error'] = f"{type(e).__name__}: {e}"
+    return result
+
+def run_batch(manifest_file: str, workers: Optional[int] = None, summary_file: Optional[str] = None) -> pd.DataFrame:
+    """Runs every portfolio in the manifest across a process pool, sharing one set of TTBR rates."""
+    entries = read_manifest(manifest_file)
+    if not entries:
+        logger.warning(f"Manifest '{manifest_file}' lists no portfolios.")
+        results_df = pd.DataFrame(columns=RESULT_COLUMNS)
+        if summary_file:
+            results_df.to_csv(summary_file, index=False)
+        return results_df
+    ttbr_rates = load_ttbr_rates(
+        config.TTBR_RATES_URL, config.TTBR_CACHE_FILE, required_dates=[datetime.now()],
+        refresh=config.TTBR_FORCE_REFRESH, offline=config.TTBR_OFFLINE
+    )
+
+    with ProcessPoolExecutor(max_workers=workers or config.BATCH_WORKERS, initializer=_init_worker, initargs=(ttbr_rates,)) as executor:
+        results_df = pd.DataFrame(list(executor.map(_run_portfolio, entries)), columns=RESULT_COLUMNS)
+
+    passed = (results_df['Status'] == 'Pass').sum()
+    logger.log(logging.INFO if passed == len(results_df) else logging.WARNING, f"Batch complete: {passed} of {len(results_df)} portfolios passed.", extra={'passed': int(passed), 'portfolios': len(results_df)})
+    if summary_file:
+        results_df.to_csv(summary_file, index=False)
+    return results_df
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the capital gains and advance tax calculation for many portfolios.")
+    parser.add_argument('manifest', help="CSV with Name, Input_Dir, Other_Income_INR and optional Output_File columns.")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: config.BATCH_WORKERS).")
+    parser.add_argument('--summary', default=config.BATCH_SUMMARY_FILE, help="Where to write the per-portfolio results CSV.")
+    args = parser.parse_args()
+    configure_logging(config.LOG_LEVEL, config.LOG_FORMAT)
+    run_batch(args.manifest, args.workers, args.summary)
\ No newline at end of file
@@ -0,0 +1,214 @@
+# tax_advisor/benchmarks/run.py
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import itertools
+import platform
+import tempfile
+import statistics
+import numpy as np
+import pandas as pd
+import config
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from data_loader.loader import load_and_clean_data, load_ttbr_rates
+from core_logic.fifo_calculator import perform_fifo_matching, get_inr_conversion_rate
+from core_logic.tax_calculator import calculate_tax_liability, calculate_advance_tax_schedule
+from core_logic.financial_strategy import generate_loss_harvesting_report
+from reporting.excel_report import generate_excel_report
+from utils.helpers import perform_validations
+from utils.profiling import configure_logging
+from benchmarks.synthetic import INPUT_FILES, generate_inputs
+
+DEFAULT_SIZES = [10, 1000, 100000]
+REGRESSION_THRESHOLD = 1.2
+MIN_RUN_SECONDS = 0.2  # Fast stages are looped until one timed run lasts at least this long, as timeit's autorange does.
+NOISE_FLOOR_SECONDS = 0.01  # Slowdowns smaller than this per call are timer noise, whatever their ratio.
+FY_START_YEAR = 2021  # A financial year the synthetic sales cover, so the schedule has work to do.
+
+def _prepare(data_dir: str, sales_rows: int, seed: int) -> Dict[str, Any]:
+    """Generates (or reuses) the inputs for one size and computes what each stage needs as its input."""
+    size_dir = os.path.join(data_dir, f"sales_{sales_rows}_seed_{seed}")
+    paths = {key: os.path.join(size_dir, name) for key, name in INPUT_FILES.items()}
+    if not all(os.path.exists(path) for path in paths.values()):
+        paths = generate_inputs(size_dir, sales_rows, seed)
+    sales_df, acq_df, quotes = load_and_clean_data(paths['sales'], paths['releases'], paths['quotes'], engine=config.CSV_ENGINE)
+    ttbr_rates = load_ttbr_rates(paths['ttbr'], os.path.join(size_dir, 'ttbr_rates_cache.npy'), refresh=True)
+    slices, acq_status_df, used_rates, warnings = perform_fifo_matching(sales_df, acq_df, ttbr_rates, engine=config.FIFO_ENGINE)
+    tax_data = calculate_tax_liability(slices, config.INCOME_FROM_OTHER_SOURCES_INR)
+    return {
+        'paths': paths, 'output_dir': size_dir, 'rates': ttbr_rates.rates, 'ttbr_rates': ttbr_rates,
+        'sales_df': sales_df, 'acq_df': acq_df, 'quotes': quotes,
+        'slices': slices, 'acq_status_df': acq_status_df, 'used_rates': used_rates, 'warnings': warnings,
+        'tax_data': tax_data,
+        'schedule_df': calculate_advance_tax_schedule(slices, config.INCOME_FROM_OTHER_SOURCES_INR, FY_START_YEAR),
+        'loss_harvesting_df': generate_loss_harvesting_report(acq_status_df, quotes, ttbr_rates, []),
+        'validation_results': perform_validations(sales_df, acq_df, slices, acq_status_df, tax_data),
+    }
+
+def _bench_load(ctx):
+    paths = ctx['paths']
+    load_and_clean_data(paths['sales'], paths['releases'], paths['quotes'], engine=config.CSV_ENGINE, timings=ctx.setdefault('substages', {}))
+
+def _bench_fifo(ctx):
+    perform_fifo_matching(ctx['sales_df'], ctx['acq_df'], ctx['ttbr_rates'], engine=config.FIFO_ENGINE)
+
+def _bench_conversion_rate(ctx):
+    warnings = []
+    for sale_date in ctx['sales_df']['Sale_Date']:
+        get_inr_conversion_rate(sale_date, ctx['rates'], warnings)
+
+def _bench_rate_index_lookup(ctx):
+    ctx['ttbr_rates'].lookup(ctx['sales_df']['Sale_Date'], [])
+
+def _bench_advance_tax(ctx):
+    calculate_advance_tax_schedule(ctx['slices'], config.INCOME_FROM_OTHER_SOURCES_INR, FY_START_YEAR)
+
+def _bench_loss_harvesting(ctx):
+    generate_loss_harvesting_report(ctx['acq_status_df'], ctx['quotes'], ctx['ttbr_rates'], [])
+
+def _bench_excel_report(ctx):
+    generate_excel_report(
+        output_file=os.path.join(ctx['output_dir'], 'benchmark_report.xlsx'),
+        writer=config.REPORT_WRITER,
+        original_reports=config.ORIGINAL_REPORTS,
+        original_reports_max_rows=config.ORIGINAL_REPORTS_MAX_ROWS,
+        summary_df=ctx['slices'].to_frame(),
+        acq_status_df=ctx['acq_status_df'],
+        tax_data=ctx['tax_data'],
+        schedule_df=ctx['schedule_df'],
+        used_rates_df=pd.DataFrame(list(ctx['used_rates'].items()), columns=['Date', 'TTBR']).sort_values('Date'),
+        warnings_df=pd.DataFrame(ctx['warnings']),
+        loss_harvesting_df=ctx['loss_harvesting_df'],
+        sales_df=ctx['sales_df'],
+        acq_df=ctx['acq_df'],
+        validation_results=ctx['validation_results']
+    )
+
+# Each benchmark times one stage on inputs prepared beforehand. 'rate_index_lookup' is the vectorized
+# counterpart of the per-date 'get_inr_conversion_rate', over the same sale dates. A benchmark may record
+# its own steps' seconds (from its last call) in ctx['substages'], which are stored with its result.
+BENCHMARKS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    'load_and_clean_data': _bench_load,
+    'perform_fifo_matching': _bench_fifo,
+    'get_inr_conversion_rate': _bench_conversion_rate,
+    'rate_index_lookup': _bench_rate_index_lookup,
+    'calculate_advance_tax_schedule': _bench_advance_tax,
+    'generate_loss_harvesting_report': _bench_loss_harvesting,
+    'generate_excel_report': _bench_excel_report,
+}
+
+def _run_loops(benchmark: Callable, ctx: Dict[str, Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        benchmark(ctx)
+    return time.perf_counter() - start
+
+def _time(benchmark: Callable, ctx: Dict[str, Any], repeat: int) -> Tuple[List[float], int]:
+    """Seconds per call over `repeat` timed runs, and the loops per run.
+
+    The loop count is found as timeit's autorange does (1, 2, 5, 10, 20, ...) until a run takes at least
+    `MIN_RUN_SECONDS`, so sub-millisecond stages are timed over many calls instead of one.
+    """
+    loops, elapsed = 1, _run_loops(benchmark, ctx, 1)
+    for multiplier in itertools.cycle((2, 2.5, 2)):
+        if elapsed >= MIN_RUN_SECONDS:
+            break
+        loops = int(loops * multiplier)
+        elapsed = _run_loops(benchmark, ctx, loops)
+    timings = [elapsed / loops] + [_run_loops(benchmark, ctx, loops) / loops for _ in range(repeat - 1)]
+    return timings, loops
+
+def run_benchmarks(sizes: List[int], names: List[str], repeat: int = 5, seed: int = 0, data_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Times each named benchmark `repeat` times per input size. A benchmark that fails is recorded with its error."""
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmark '{unknown[0]}'. Choose one of: {', '.join(BENCHMARKS)}")
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'tax_advisor_benchmarks')
+
+    results = []
+    for sales_rows in sizes:
+        ctx = _prepare(data_dir, sales_rows, seed)
+        for name in names:
+            result = {'benchmark': name, 'sales_rows': sales_rows, 'lots': len(ctx['acq_df']), 'slices': len(ctx['slices'])}
+            try:
+                timings, loops = _time(BENCHMARKS[name], ctx, repeat)
+                result.update({'status': 'ok', 'best_seconds': min(timings), 'median_seconds': statistics.median(timings), 'loops': loops, 'timings': timings})
+            except Exception as e:
+                result.update({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+            substages = ctx.pop('substages', None)
+            if substages and result['status'] == 'ok':
+                result['substages'] = substages
+            results.append(result)
+            print(f"{name:<32} {sales_rows:>9} rows  " + (f"{result['best_seconds']:.4f}s" if result['status'] == 'ok' else result['error']))
+
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed, 'repeat': repeat,
+        'environment': {
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'csv_engine': config.CSV_ENGINE, 'fifo_engine': config.FIFO_ENGINE,
+            'report_writer': config.REPORT_WRITER, 'original_reports': config.ORIGINAL_REPORTS,
+        },
+        'results': results,
+    }
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD, noise_floor: float = NOISE_FLOOR_SECONDS) -> pd.DataFrame:
+    """Best times of `current` against `baseline` per benchmark and size.
+
+    A ratio above `threshold` is a regression (or below its inverse an improvement) only when the two
+    best times also differ by more than `noise_floor` seconds.
+    """
+    def best_times(run):
+        return pd.DataFrame([r for r in run['results'] if r['status'] == 'ok'], columns=['benchmark', 'sales_rows', 'best_seconds'])
+
+    comparison = best_times(baseline).merge(best_times(current), on=['benchmark', 'sales_rows'], how='right', suffixes=('_baseline', '_current'))
+    comparison['ratio'] = comparison['best_seconds_current'] / comparison['best_seconds_baseline']
+    beyond_noise = (comparison['best_seconds_current'] - comparison['best_seconds_baseline']).abs() > noise_floor
+    comparison['status'] = np.select(
+        [comparison['ratio'].isna(), beyond_noise & (comparison['ratio'] > threshold), beyond_noise & (comparison['ratio'] < 1 / threshold)],
+        ['new', 'regression', 'improvement'], default='ok'
+    )
+    return comparison
+
+def _latest_result(results_dir: str) -> Optional[str]:
+    files = sorted(glob.glob(os.path.join(results_dir, 'benchmark_*.json')))
+    return files[-1] if files else None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data, fully offline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Sales rows per generated input set (10 to 1000000).")
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS), choices=list(BENCHMARKS), help="Benchmarks to run (default: all).")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark, each auto-ranged to at least MIN_RUN_SECONDS; the best is compared.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data generator.")
+    parser.add_argument('--data-dir', default=None, help="Where generated inputs are written (default: a folder in the temp directory).")
+    parser.add_argument('--results-dir', default='benchmark_results', help="Where each run's JSON results are stored.")
+    parser.add_argument('--compare', default=None, help="Results JSON to compare with (default: the latest run in --results-dir).")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="Slowdown ratio reported as a regression.")
+    parser.add_argument('--noise-floor', type=float, default=NOISE_FLOOR_SECONDS, help="Smallest slowdown in seconds per call that can count as a regression.")
+    args = parser.parse_args(argv)
+    configure_logging('WARNING')
+
+    baseline_file = args.compare or _latest_result(args.results_dir)
+    current = run_benchmarks(args.sizes, args.benchmarks, args.repeat, args.seed, args.data_dir)
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    result_file = os.path.join(args.results_dir, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(result_file, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResults written to '{result_file}'.")
+
+    if not baseline_file:
+        return 0
+    with open(baseline_file) as f:
+        comparison = compare_results(current, json.load(f), args.threshold, args.noise_floor)
+    print(f"\nCompared with '{baseline_file}':")
+    print(comparison.to_string(index=False, float_format='{:.4f}'.format))
+    return 1 if (comparison['status'] == 'regression').any() else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
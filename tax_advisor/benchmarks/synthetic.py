@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+FIRST_VEST_DATE = pd.Timestamp('2019-01-02')
+VEST_SPAN_DAYS = 5 * 365
+MAX_HOLDING_DAYS = 900
+QUOTE_START, QUOTE_END = '2019-01-01', '2025-12-31'
+TTBR_START, TTBR_END = '2018-01-01', '2035-12-31'
+INPUT_FILES = {
+    'sales': 'Capital Gains Report.csv',
+    'releases': 'Releases Report.csv',
+    'quotes': 'Quote History.csv',
+    'ttbr': 'SBI_REFERENCE_RATES_USD.csv',
+}
+
+def _usd(values: np.ndarray) -> pd.Series:
+    return pd.Series(values).map('${:,.2f}'.format)
+
+def _write_report(path: str, title_lines: str, df: pd.DataFrame, footer: str = ''):
+    """Writes a brokerage-style report: title lines, the CSV table, then an optional footer line."""
+    with open(path, 'w', newline='') as f:
+        f.write(title_lines)
+        df.to_csv(f, index=False)
+        f.write(footer)
+
+def generate_inputs(output_dir: str, sales_rows: int, seed: int = 0) -> Dict[str, str]:
+    """Writes a reproducible set of the three brokerage reports and a TTBR CSV with `sales_rows` sales.
+
+    There is one release per four sales. Every sale follows the vest it draws from and sells part of it,
+    so the FIFO books never run short. Dates are written as '%d-%b-%Y', as in the brokerage reports.
+    Returns the path of each file, keyed as in `INPUT_FILES`.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {key: os.path.join(output_dir, name) for key, name in INPUT_FILES.items()}
+    lots = max(1, sales_rows // 4)
+
+    # Releases: vest dates spread over five years, starting on FIRST_VEST_DATE.
+    vest_days = np.sort(rng.integers(0, VEST_SPAN_DAYS, lots))
+    vest_days[0] = 0
+    vest_dates = FIRST_VEST_DATE + pd.to_timedelta(vest_days, unit='D')
+    net_shares = rng.integers(4, 60, lots) + np.where(rng.random(lots) < 0.2, 0.5, 0.0)
+    vest_prices = np.round(rng.uniform(80, 180, lots), 2)
+    _write_report(paths['releases'], 'Releases Report\n', pd.DataFrame({
+        'Vest Date': vest_dates.strftime('%d-%b-%Y'),
+        'Order Number': np.arange(1000, 1000 + lots),
+        'Plan': 'GSU Class C', 'Type': 'Release', 'Status': 'Staged',
+        'Price': _usd(vest_prices),
+        'Quantity': net_shares * 1.5,
+        'Net Cash Proceeds': '$0.00',
+        'Net Share Proceeds': net_shares,
+        'Tax Payment Method': 'Fractional Shares',
+    }), 'Total,,,,,,,,,\n')
+
+    # Sales: each one draws from a single lot after its vest date; together they sell 90% of those lots.
+    sale_lots = np.sort(np.concatenate(([0], rng.integers(0, lots, sales_rows - 1)))) if sales_rows else np.array([], dtype=int)
+    sales_per_lot = np.bincount(sale_lots, minlength=lots)
+    shares = np.floor(net_shares[sale_lots] * 0.9 / sales_per_lot[sale_lots] * 1000) / 1000
+    holding_days = rng.integers(1, MAX_HOLDING_DAYS, sales_rows)
+    if sales_rows:
+        holding_days[0] = 1
+    order = np.argsort(vest_days[sale_lots] + holding_days, kind='stable')
+    sale_dates = vest_dates[sale_lots[order]] + pd.to_timedelta(holding_days[order], unit='D')
+    sale_prices = np.round(rng.uniform(70, 220, sales_rows), 2)
+    shares = shares[order]
+    _write_report(paths['sales'], 'Capital Gains Report\nAccount,XXXX-1234\n', pd.DataFrame({
+        'Date Sold': sale_dates.strftime('%d-%b-%Y'),
+        'Sale Price': _usd(sale_prices),
+        'Shares': shares,
+        'Symbol': 'GOOG',
+        'Gross Proceeds': _usd(sale_prices * shares),
+        'Acquisition Date': vest_dates[sale_lots[order]].strftime('%d-%b-%Y'),
+    }), 'Total,,,,,\n')
+
+    # Quotes: a daily random walk for the tracked ticker, ending below many vest prices so some lots show losses.
+    quote_dates = pd.bdate_range(QUOTE_START, QUOTE_END)
+    walk = np.cumsum(rng.normal(0, 1.2, len(quote_dates)))
+    quote_prices = np.round(np.clip(110 + walk - walk[-1], 40, None), 2)
+    _write_report(paths['quotes'], 'Quote History\n', pd.DataFrame({
+        'Fund': 'GOOG - Alphabet Inc. Class C',
+        'Date': quote_dates.strftime('%m/%d/%Y'),
+        'Price': _usd(quote_prices),
+    }))
+
+    # TTBR: business-day rates well past today, so lookups for the current date never need the network.
+    rate_dates = pd.bdate_range(TTBR_START, TTBR_END)
+    tt_buy = np.round(70 + np.cumsum(rng.normal(0.005, 0.08, len(rate_dates))), 2)
+    pd.DataFrame({
+        'DATE': rate_dates.strftime('%Y-%m-%d 09:00'), 'PDF FILE': 'synthetic.pdf',
+        'TT BUY': tt_buy, 'TT SELL': tt_buy + 0.85,
+    }).to_csv(paths['ttbr'], index=False)
+    return paths
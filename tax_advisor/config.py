@@ -1,15 +1,78 @@
 # --- User Configuration ---
 # Enter estimated income from other sources (e.g., salary) for accurate surcharge calculation.
 INCOME_FROM_OTHER_SOURCES_INR = 11000000.00  # Example: 1.1 Cr.
+# Starting year of the financial year for the advance tax schedule (e.g. 2024 for FY 2024-25). None uses the current FY.
+FINANCIAL_YEAR_START = None
 
 # --- File Configuration ---
 CAPITAL_GAINS_FILE = 'Capital Gains Report.csv'
 RELEASES_FILE = 'Releases Report.csv'
 QUOTE_HISTORY_FILE = 'Quote History.csv'
 OUTPUT_EXCEL_FILE = 'capital_gains_summary_final.xlsx'
+# CSV parser for the input reports: 'python' (original), 'c' or 'pyarrow' (fast paths with identical output).
+CSV_ENGINE = 'c'
+# strftime-style format of the report dates, e.g. '%d-%b-%Y'. None lets pandas infer it.
+INPUT_DATE_FORMAT = None
+
+# --- Portfolio Configuration ---
+# The Releases Report has no symbol column, so each Plan is mapped to its ticker; unlisted plans use DEFAULT_SYMBOL.
+PLAN_SYMBOLS = {'GSU Class C': 'GOOG'}
+DEFAULT_SYMBOL = 'GOOG'
+# Quote History rows belong to a ticker when its Fund name contains the ticker, as 'GOOG' also matches 'GOOGL' funds.
+# A regex here replaces that test for a ticker, e.g. {'GOOG': r'\bGOOG\b'} to leave out 'GOOGL' rows.
+QUOTE_FUND_PATTERNS = {}
+# Columns that split sales and lots into independent FIFO books; 'Symbol' is required. ['Symbol', 'Plan'] keeps
+# one book per plan, which needs a Plan column in the Capital Gains Report too.
+LOT_BOOK_COLUMNS = ['Symbol']
+FIFO_BOOK_WORKERS = None  # Threads for matching books in parallel; None uses one per book, up to the CPU count.
+
+# --- Calculation Engine ---
+# 'vectorized' matches sales to lots with NumPy interval arithmetic; 'loop' is the original row-by-row matcher.
+FIFO_ENGINE = 'vectorized'
+# Saves the FIFO lot state next to the Excel report so the next run only matches new sales and vests.
+# Any edit to previously processed rows triggers a full recompute. None always matches the whole history.
+FIFO_STATE_FILE = None  # e.g. 'fifo_state.npz', with a 'fifo_state.npz.json' written beside it
+# Rows per chunk for the streaming pipeline, for sales reports too large to hold in memory. The report must be
+# in ascending date order. None runs the in-memory pipeline.
+STREAMING_CHUNK_SIZE = None
+
+# --- Tax-Loss Harvesting ---
+# The 'Harvesting Plan' sheet picks the lots whose losses offset this year's taxable gains with the fewest shares.
+# True only considers selling each ticker's oldest lots first, which is how the sale would then be FIFO-matched.
+HARVEST_RESPECT_FIFO = True
+
+# --- Report Configuration ---
+# Excel backend: 'openpyxl' (original) or 'xlsxwriter' (constant-memory streaming writer; pip install xlsxwriter).
+REPORT_WRITER = 'openpyxl'
+# How the input reports are copied into the workbook: 'full', 'sample' (evenly spaced rows) or 'skip'.
+ORIGINAL_REPORTS = 'full'
+ORIGINAL_REPORTS_MAX_ROWS = 1000  # Rows kept per report when ORIGINAL_REPORTS is 'sample'.
+# Also export every report table as 'csv', 'json' and/or 'parquet' (parquet needs pyarrow), e.g. ['csv'].
+TABLE_EXPORT_FORMATS = []
+TABLE_EXPORT_DIR = None  # None writes to '<output name>_tables/<format>/' next to the Excel report.
+
+# --- Logging & Profiling ---
+LOG_LEVEL = 'INFO'
+LOG_FORMAT = 'text'  # 'text' for plain messages or 'json' for one structured record per line.
+# Records wall time, CPU time and row counts of each pipeline stage into RUN_PROFILE_FILE (next to the report).
+PROFILE_RUN = False
+RUN_PROFILE_FILE = 'run_profile.json'
+PROFILE_MEMORY = False  # Also record each stage's peak Python memory (tracemalloc; slows the run down).
+# Runs one stage ('load', 'ttbr_rates', 'fifo_matching', 'tax', 'harvesting', 'validations' or 'report') under cProfile
+# and saves its stats as '<stage>.prof' next to the report. None profiles nothing.
+PROFILE_STAGE = None
+
+# --- Batch Configuration ---
+BATCH_WORKERS = None  # Worker processes for batch.py; None uses one per CPU.
+BATCH_SUMMARY_FILE = 'batch_summary.csv'
 
 # --- Data Sources ---
+# May also be a local CSV path in the same format, e.g. a fixture file for tests.
 TTBR_RATES_URL = 'https://github.com/sahilgupta/sbi-fx-ratekeeper/blob/main/csv_files/SBI_REFERENCE_RATES_USD.csv'
+# Local rate store; refreshed from TTBR_RATES_URL only when it is missing or does not cover the transactions.
+TTBR_CACHE_FILE = 'ttbr_rates_cache.npy'
+TTBR_FORCE_REFRESH = False
+TTBR_OFFLINE = False  # Never contact TTBR_RATES_URL; fail if the cache lacks a required month.
 
 # --- Tax Configuration (as of FY 2024-25) ---
 TAX_RATES = {
@@ -1,28 +1,220 @@
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from datetime import datetime
-from .fifo_calculator import get_inr_conversion_rate
+import config
+from .rate_index import TTBRRateIndex, as_rate_index
+from .quote_index import QuoteIndex
+from .fifo_calculator import SHARE_EPSILON
+from .ledger import SliceLedger, LTCG_HOLDING_DAYS
+from .tax_calculator import gain_totals, tax_liability_from_totals
 
-def generate_loss_harvesting_report(acq_status_df: pd.DataFrame, latest_price: float, ttbr_rates: Dict, warnings: List) -> pd.DataFrame:
-    """Identifies vested shares with unrealized losses."""
-    if latest_price == 0: return pd.DataFrame()
-    
+INR_EPSILON = 0.005  # Half a paisa: an offset target smaller than this counts as met.
+
+def generate_loss_harvesting_report(acq_status_df: pd.DataFrame, quotes: QuoteIndex, ttbr_rates: Union[Dict, TTBRRateIndex], warnings: List) -> pd.DataFrame:
+    """Identifies vested shares with unrealized losses, valuing each lot at the latest price of its symbol."""
     harvestable = acq_status_df[acq_status_df['Remaining_Shares'] > 0].copy()
+    harvestable['Current_Market_Price_USD'] = quotes.latest(harvestable['Symbol'])
+    harvestable = harvestable[harvestable['Current_Market_Price_USD'] != 0]
     if harvestable.empty: return pd.DataFrame()
     
-    harvestable['Current_Market_Price_USD'] = latest_price
-    latest_rate_key, latest_rate = get_inr_conversion_rate(datetime.now(), ttbr_rates, warnings)
+    rate_index = as_rate_index(ttbr_rates)
+    latest_rate_key, latest_rate = rate_index.get_rate(datetime.now(), warnings)
     
     harvestable['Current_Market_Value_INR'] = harvestable['Current_Market_Price_USD'] * harvestable['Remaining_Shares'] * latest_rate
     
-    original_cost_inr = []
-    for row in harvestable.itertuples():
-        acq_rate_key, acq_rate = get_inr_conversion_rate(row.Acquisition_Date, ttbr_rates, warnings)
-        original_cost_inr.append(row.Acquisition_Price * row.Remaining_Shares * acq_rate)
-    harvestable['Original_Cost_of_Remaining_INR'] = original_cost_inr
+    acq_rate_keys, acq_rates = rate_index.lookup(harvestable['Acquisition_Date'], warnings)
+    harvestable['Original_Cost_of_Remaining_INR'] = harvestable['Acquisition_Price'] * harvestable['Remaining_Shares'] * acq_rates
     
     harvestable['Unrealized_Gain_Loss_INR'] = harvestable['Current_Market_Value_INR'] - harvestable['Original_Cost_of_Remaining_INR']
     
     harvestable = harvestable[harvestable['Unrealized_Gain_Loss_INR'] < 0]
     
-    return harvestable[['Acquisition_Date', 'Remaining_Shares', 'Acquisition_Price', 'Current_Market_Price_USD', 'Unrealized_Gain_Loss_INR']].sort_values(by='Unrealized_Gain_Loss_INR')
\ No newline at end of file
+    return harvestable[['Symbol', 'Acquisition_Date', 'Remaining_Shares', 'Acquisition_Price', 'Current_Market_Price_USD', 'Unrealized_Gain_Loss_INR']].sort_values(by='Unrealized_Gain_Loss_INR')
+
+def value_open_lots(acq_status_df: pd.DataFrame, quotes: QuoteIndex, ttbr_rates: Union[Dict, TTBRRateIndex], warnings: Optional[List] = None, sale_date: Optional[datetime] = None) -> pd.DataFrame:
+    """Values one share of every open, quoted lot as if sold on `sale_date` (default today), in one pass.
+
+    Adds the sale date, the INR value and cost per share, the TTBRs behind them, and the gain type a sale on
+    that date would have.
+    """
+    sale_date = pd.Timestamp(sale_date or datetime.now())
+    lots = acq_status_df[acq_status_df['Remaining_Shares'] > 0].copy()
+    lots['Current_Market_Price_USD'] = quotes.latest(lots['Symbol'])
+    lots = lots[lots['Current_Market_Price_USD'] != 0].reset_index(drop=True)
+
+    rate_index = as_rate_index(ttbr_rates)
+    sale_rate_key, sale_rate = rate_index.get_rate(sale_date, warnings)
+    lots['Sale_Date'] = sale_date
+    lots['Sale_TTBR'] = sale_rate
+    lots['Acquisition_TTBR'] = rate_index.lookup(lots['Acquisition_Date'], warnings)[1] if len(lots) else 0.0
+    lots['Value_Per_Share_INR'] = lots['Current_Market_Price_USD'] * lots['Sale_TTBR']
+    lots['Cost_Per_Share_INR'] = lots['Acquisition_Price'] * lots['Acquisition_TTBR']
+    lots['Gain_Type'] = np.where((sale_date - lots['Acquisition_Date']).dt.days > LTCG_HOLDING_DAYS, 'LTCG', 'STCG')
+    return lots
+
+def _fill_losses(loss_per_share: np.ndarray, shares: np.ndarray, eligible: np.ndarray, need: np.ndarray) -> np.ndarray:
+    """Sells eligible loss-making shares, highest loss per share first, until each row's `need` is covered."""
+    density = np.where(eligible & (loss_per_share > 0), loss_per_share, 0.0)
+    order = np.argsort(-density, axis=1, kind='stable')
+    sorted_density = np.take_along_axis(density, order, axis=1)
+    sorted_shares = np.take_along_axis(shares, order, axis=1)
+    lot_loss = sorted_density * sorted_shares
+    loss_before = np.cumsum(lot_loss, axis=1) - lot_loss
+    taken_loss = np.clip(need[:, None] - loss_before, 0.0, lot_loss)
+    taken = np.where(taken_loss >= lot_loss, sorted_shares, taken_loss / np.where(sorted_density > 0, sorted_density, 1.0))
+    sold = np.empty_like(taken)
+    np.put_along_axis(sold, order, np.where(sorted_density > 0, taken, 0.0), axis=1)
+    return sold
+
+def select_harvest_lots(loss_per_share, shares, is_long, need_stcg, need_ltcg, stcg_left=0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Greedy (fractional knapsack) choice of the fewest shares whose losses cover the STCG and LTCG needs.
+
+    Only short-term losses can offset STCG, so they are spent on `need_stcg` first. `stcg_left` is the net STCG
+    the plan leaves in place. Losses are then allocated in set-off order: while any STCG is left, short-term
+    losses reduce it before LTCG. So `need_ltcg` takes long-term losses first, and then enough short-term
+    losses to cover the STCG left as well. With no STCG left, short- and long-term losses go to `need_ltcg`
+    together, highest loss per share first. Takes (lots,) arrays, or (scenarios, lots) arrays with needs per
+    scenario. Returns the shares sold against STCG and against LTCG.
+    """
+    loss_per_share = np.asarray(loss_per_share, dtype=float)
+    single = loss_per_share.ndim == 1
+    loss_per_share = np.atleast_2d(loss_per_share)
+    shares = np.broadcast_to(np.asarray(shares, dtype=float), loss_per_share.shape)
+    is_long = np.broadcast_to(np.asarray(is_long, dtype=bool), loss_per_share.shape)
+    rows = loss_per_share.shape[0]
+
+    need_stcg, need_ltcg = np.broadcast_to(need_stcg, rows).astype(float), np.broadcast_to(need_ltcg, rows).astype(float)
+    for_stcg = _fill_losses(loss_per_share, shares, ~is_long, need_stcg)
+    unsold = shares - for_stcg
+    # STCG still standing after the STCG pass: what the plan leaves, plus any need the short-term losses missed.
+    stcg_standing = np.broadcast_to(stcg_left, rows) + np.clip(need_stcg - (np.maximum(loss_per_share, 0.0) * for_stcg).sum(axis=1), 0.0, None)
+
+    any_loss = _fill_losses(loss_per_share, unsold, np.ones_like(is_long), need_ltcg)
+    long_loss = _fill_losses(loss_per_share, unsold, is_long, need_ltcg)
+    ltcg_short = np.clip(need_ltcg - (np.maximum(loss_per_share, 0.0) * long_loss).sum(axis=1), 0.0, None)
+    short_loss = _fill_losses(loss_per_share, unsold - long_loss, ~is_long, np.where(ltcg_short > INR_EPSILON, stcg_standing + ltcg_short, 0.0))
+    for_ltcg = np.where((stcg_standing > INR_EPSILON)[:, None], long_loss + short_loss, any_loss)
+    return (for_stcg[0], for_ltcg[0]) if single else (for_stcg, for_ltcg)
+
+def _lot_components(gain_per_share: np.ndarray, shares: np.ndarray, is_long: np.ndarray) -> np.ndarray:
+    """STCG, STCL, LTCG and LTCL realized by selling `shares` of each lot, as a (4, lots) array."""
+    gain = gain_per_share * shares
+    gains, losses = np.maximum(gain, 0.0), np.maximum(-gain, 0.0)
+    return np.vstack((np.where(is_long, 0.0, gains), np.where(is_long, 0.0, losses), np.where(is_long, gains, 0.0), np.where(is_long, losses, 0.0)))
+
+def _taxable_gains(totals: np.ndarray, other_income: float) -> np.ndarray:
+    liability = tax_liability_from_totals(*totals, other_income)
+    return liability['net_taxable_stcg'] + liability['net_taxable_ltcg']
+
+def _select_fifo_prefixes(lots: pd.DataFrame, book_columns: List[str], gain_per_share: np.ndarray, is_long: np.ndarray, totals: np.ndarray, other_income: float, target: float) -> np.ndarray:
+    """Shares to sell when each book's sales must take its oldest open lots first, as FIFO matching will.
+
+    Repeatedly takes the book whose shortest FIFO prefix reaching the remaining target (or its best prefix, if
+    none does) offsets the most taxable gain per share sold; gains realized on the way are netted off.
+    """
+    shares = lots['Remaining_Shares'].to_numpy(dtype=float)
+    sold = np.zeros(len(lots))
+    pending = list(lots.groupby(book_columns, sort=True).indices.values()) if book_columns else [np.arange(len(lots))]
+    realized = np.asarray(totals, dtype=float).copy()
+
+    while target > INR_EPSILON and pending:
+        base = _taxable_gains(realized, other_income)
+        best = None
+        for i, book in enumerate(pending):
+            steps = _lot_components(gain_per_share[book], shares[book], is_long[book])
+            running = realized[:, None] + np.concatenate((np.zeros((4, 1)), np.cumsum(steps, axis=1)), axis=1)
+            offsets = base - _taxable_gains(running, other_income)
+            reached = np.flatnonzero(offsets >= target)
+            end = reached[0] if len(reached) else int(np.argmax(offsets))
+            if end == 0 or offsets[end] <= 0:
+                continue
+            book_sold = np.where(np.arange(len(book)) < end, shares[book], 0.0)
+            if len(reached):
+                # Each share of the last lot offsets its loss until taxable gains run out, so part of it is enough.
+                last_loss = -gain_per_share[book[end - 1]] * shares[book[end - 1]]
+                book_sold[end - 1] *= min(1.0, (target - offsets[end - 1]) / last_loss)
+            offset = min(offsets[end], target)
+            if best is None or offset / book_sold.sum() > best[0]:
+                best = (offset / book_sold.sum(), i, book_sold, offset)
+        if best is None:
+            break
+        _, i, book_sold, offset = best
+        book = pending.pop(i)
+        sold[book] = book_sold
+        realized += _lot_components(gain_per_share[book], book_sold, is_long[book]).sum(axis=1)
+        target -= offset
+    return sold
+
+def optimize_loss_harvesting(realized: Union[SliceLedger, np.ndarray], lots: pd.DataFrame, other_income: float, target_stcg: Optional[float] = None, target_ltcg: Optional[float] = None, respect_fifo: bool = False, book_columns: Optional[Sequence[str]] = None) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """Chooses which open lots, and how many shares of each, to sell to offset the year's taxable gains.
+
+    `realized` is the year's slice ledger or its gain totals (see `gain_totals`), and `lots` comes from
+    `value_open_lots`. The targets default to all net taxable STCG and LTCG. By default any
+    lot may be picked (see `select_harvest_lots`); `respect_fifo` only sells each book's oldest lots first,
+    the order in which a real sale would be matched. Books are keyed by `book_columns` (default
+    `config.LOT_BOOK_COLUMNS`), which also lead the plan. Returns the sale plan and the tax before and after it.
+    """
+    book_columns = list(config.LOT_BOOK_COLUMNS if book_columns is None else book_columns)
+    totals = gain_totals(realized)
+    before = {key: float(value) for key, value in tax_liability_from_totals(*totals, other_income).items()}
+    need_stcg = before['net_taxable_stcg'] if target_stcg is None else min(target_stcg, before['net_taxable_stcg'])
+    need_ltcg = before['net_taxable_ltcg'] if target_ltcg is None else min(target_ltcg, before['net_taxable_ltcg'])
+
+    gain_per_share = (lots['Value_Per_Share_INR'] - lots['Cost_Per_Share_INR']).to_numpy(dtype=float)
+    shares = lots['Remaining_Shares'].to_numpy(dtype=float)
+    is_long = (lots['Gain_Type'] == 'LTCG').to_numpy()
+    if respect_fifo:
+        shares_to_sell = _select_fifo_prefixes(lots, book_columns, gain_per_share, is_long, totals, other_income, need_stcg + need_ltcg)
+    else:
+        shares_to_sell = np.add(*select_harvest_lots(-gain_per_share, shares, is_long, need_stcg, need_ltcg, before['net_taxable_stcg'] - need_stcg))
+
+    after_totals = totals + _lot_components(gain_per_share, shares_to_sell, is_long).sum(axis=1)
+    after = {key: float(value) for key, value in tax_liability_from_totals(*after_totals, other_income).items()}
+
+    plan = lots.assign(Shares_To_Sell=shares_to_sell, Gain_Loss_Per_Share_INR=gain_per_share, Realized_Gain_Loss_INR=gain_per_share * shares_to_sell)
+    plan = plan[plan['Shares_To_Sell'] > SHARE_EPSILON]
+    if not respect_fifo:
+        plan = plan.sort_values('Gain_Loss_Per_Share_INR', kind='stable')
+    plan = plan[book_columns + ['Acquisition_Date', 'Remaining_Shares', 'Shares_To_Sell', 'Current_Market_Price_USD', 'Gain_Type', 'Gain_Loss_Per_Share_INR', 'Realized_Gain_Loss_INR']].reset_index(drop=True)
+
+    outcome = {
+        'Shares To Sell': float(shares_to_sell.sum()),
+        'STCG Offset (INR)': before['net_taxable_stcg'] - after['net_taxable_stcg'],
+        'LTCG Offset (INR)': before['net_taxable_ltcg'] - after['net_taxable_ltcg'],
+        'Tax Before (INR)': before['total_tax_liability'],
+        'Tax After (INR)': after['total_tax_liability'],
+        'Tax Saving (INR)': before['total_tax_liability'] - after['total_tax_liability'],
+    }
+    return plan, outcome
+
+def evaluate_harvesting_scenarios(realized: Union[SliceLedger, np.ndarray], lots: pd.DataFrame, other_income: float, price_multipliers) -> pd.DataFrame:
+    """Greedy harvesting plan and tax saving for every price multiplier at once, one row per scenario.
+
+    `realized` is as in `optimize_loss_harvesting`. Each scenario scales the current market prices in `lots`
+    (from `value_open_lots`); all scenarios are solved together as (scenarios, lots) arrays.
+    """
+    multipliers = np.atleast_1d(np.asarray(price_multipliers, dtype=float))
+    totals = gain_totals(realized)
+    before = tax_liability_from_totals(*totals, other_income)
+
+    value = multipliers[:, None] * lots['Value_Per_Share_INR'].to_numpy(dtype=float)[None, :]
+    gain_per_share = value - lots['Cost_Per_Share_INR'].to_numpy(dtype=float)[None, :]
+    shares = lots['Remaining_Shares'].to_numpy(dtype=float)
+    is_long = (lots['Gain_Type'] == 'LTCG').to_numpy()
+    for_stcg, for_ltcg = select_harvest_lots(-gain_per_share, shares, is_long, before['net_taxable_stcg'], before['net_taxable_ltcg'])
+    sold = for_stcg + for_ltcg
+
+    # Only loss-making shares are sold, so the plan adds short- and long-term losses alone.
+    realized_loss = -gain_per_share * sold
+    new_stcl = np.where(is_long, 0.0, realized_loss).sum(axis=1)
+    new_ltcl = np.where(is_long, realized_loss, 0.0).sum(axis=1)
+    after = tax_liability_from_totals(totals[0], totals[1] + new_stcl, totals[2], totals[3] + new_ltcl, other_income)
+
+    return pd.DataFrame({
+        'Price_Multiplier': multipliers,
+        'Shares_To_Sell': sold.sum(axis=1),
+        'Tax_Before_INR': np.broadcast_to(before['total_tax_liability'], multipliers.shape),
+        'Tax_After_INR': after['total_tax_liability'],
+        'Tax_Saving_INR': before['total_tax_liability'] - after['total_tax_liability'],
+    })
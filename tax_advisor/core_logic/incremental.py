@@ -0,0 +1,160 @@
+import io
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import config
+from .fifo_calculator import LotBooks, book_keys, lot_symbols, sale_symbols
+from .ledger import LedgerInvariants, SliceLedger, to_micro_shares
+from .rate_index import TTBRRateIndex, as_rate_index
+
+STATE_VERSION = 4
+
+def _prefix_digest(df: pd.DataFrame, rows: int) -> str:
+    """Content hash of the first `rows` rows of a frame, independent of its index.
+
+    Relies on the loader's stable date sort: rows appended to a report leave the earlier rows in the same order.
+    """
+    row_hashes = pd.util.hash_pandas_object(df.iloc[:rows], index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+def _lot_frame(acq_df: pd.DataFrame, book_columns: Sequence[str]) -> pd.DataFrame:
+    """The releases report with each lot's book columns, so a changed plan mapping also changes the hash."""
+    return pd.concat([acq_df.reset_index(drop=True), book_keys(acq_df, lot_symbols(acq_df), book_columns).add_prefix('Book_')], axis=1)
+
+def _state_meta_file(state_file: str) -> str:
+    return f"{state_file}.json"
+
+def _to_json(value: Any) -> Any:
+    """JSON form of the numpy scalars and timestamps found in the state."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Cannot store a {type(value).__name__} in the FIFO state")
+
+def _encode_by_book(values: Dict) -> List:
+    """A per-book dictionary as [key values, value] pairs, since JSON keys must be strings."""
+    return [[list(key) if isinstance(key, tuple) else [key], value] for key, value in values.items()]
+
+def _decode_by_book(pairs: List, convert=lambda value: value) -> Dict:
+    return {(key[0] if len(key) == 1 else tuple(key)): convert(value) for key, value in pairs}
+
+def _read_state(state_file: str) -> Optional[Dict[str, Any]]:
+    """Loads the state written by `_write_state`; None if it is missing, unreadable or its two files do not belong together."""
+    try:
+        with open(_state_meta_file(state_file)) as f:
+            state = json.load(f)
+        with open(state_file, 'rb') as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or hashlib.sha256(data).hexdigest() != state.get('arrays_digest'):
+        return None
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        state['lot_sold'] = arrays['lot_sold']
+        book_values = {col: np.array(values, dtype=object) for col, values in state.pop('slice_book_values').items()}
+        state['slices'] = SliceLedger.from_arrays({name: arrays[name] for name in SliceLedger.ARRAYS}, book_values)
+    state['consumed'] = _decode_by_book(state['consumed'])
+    state['unmatched'] = _decode_by_book(state['unmatched'])
+    state['last_sale'] = _decode_by_book(state['last_sale'], pd.Timestamp)
+    return state
+
+def _write_state(state_file: str, state: Dict[str, Any]):
+    """Saves the lot state without pickle: the arrays to `state_file` with `np.savez`, the rest to a JSON file beside it.
+
+    The JSON records a digest of the arrays file, so a pair left mismatched by an interrupted write is ignored.
+    """
+    state = dict(state)
+    slices = state.pop('slices')
+    temp_file = f"{state_file}.tmp"
+    with open(temp_file, 'wb') as f:
+        np.savez(f, lot_sold=state.pop('lot_sold'), **{name: getattr(slices, name) for name in SliceLedger.ARRAYS})
+    with open(temp_file, 'rb') as f:
+        state['arrays_digest'] = hashlib.sha256(f.read()).hexdigest()
+    os.replace(temp_file, state_file)
+
+    state['slice_book_values'] = {col: values.tolist() for col, values in slices.book_values.items()}
+    for name in ('consumed', 'unmatched', 'last_sale'):
+        state[name] = _encode_by_book(state[name])
+    meta_file = _state_meta_file(state_file)
+    with open(f"{meta_file}.tmp", 'w') as f:
+        json.dump(state, f, default=_to_json)
+    os.replace(f"{meta_file}.tmp", meta_file)
+
+def _stale_reason(state: Optional[Dict[str, Any]], sales_df: pd.DataFrame, lots: pd.DataFrame, book_columns: List[str]) -> Optional[str]:
+    """Why the saved state cannot be extended to these inputs, or None if it can."""
+    if state is None:
+        return "no saved FIFO state"
+    if state.get('version') != STATE_VERSION or state['book_columns'] != book_columns:
+        return "the saved FIFO state was built with different settings"
+    if len(sales_df) < state['sales_rows'] or _prefix_digest(sales_df, state['sales_rows']) != state['sales_digest']:
+        return "previously processed sales were edited or removed"
+    if len(lots) < state['acq_rows'] or _prefix_digest(lots, state['acq_rows']) != state['acq_digest']:
+        return "previously processed vests were edited or removed"
+
+    # A new lot could have covered a sale that was left short, which would change the stored slices.
+    new_lots = lots.iloc[state['acq_rows']:]
+    new_keys = new_lots[[f'Book_{col}' for col in book_columns]].itertuples(index=False, name=None)
+    for key, vest_date in zip(new_keys, new_lots['Vest_Date']):
+        key = key[0] if len(key) == 1 else key
+        if state['unmatched'].get(key, 0) > 0 and vest_date <= state['last_sale'][key]:
+            return "new vests predate sales that were left unmatched"
+    return None
+
+def perform_fifo_matching_incremental(sales_df: pd.DataFrame, acq_df: pd.DataFrame, ttbr_rates: Union[Dict, TTBRRateIndex], state_file: str, book_columns: Optional[Sequence[str]] = None, invariants: Optional[LedgerInvariants] = None) -> Tuple[SliceLedger, pd.DataFrame, Dict, List, Dict[str, Any]]:
+    """`perform_fifo_matching` that resumes from the lot state saved by the previous run in `state_file`.
+
+    When the earlier sales and vests are unchanged, only the rows added since are matched, continuing from
+    the stored lot queues; otherwise everything is recomputed. The state file is rewritten either way.
+    Also returns how the run went: 'Mode' ('Incremental' or 'Full'), 'Reason', 'New Sales' and 'New Lots'.
+    The exact share totals over the whole history are recorded into `invariants` when one is given.
+    """
+    book_columns = list(config.LOT_BOOK_COLUMNS if book_columns is None else book_columns)
+    rate_index = as_rate_index(ttbr_rates)
+    lots = _lot_frame(acq_df, book_columns)
+    state = _read_state(state_file)
+    reason = _stale_reason(state, sales_df, lots, book_columns)
+
+    if reason is None:
+        books = LotBooks(acq_df, book_columns, consumed=state['consumed'], lot_sold=state['lot_sold'],
+                         invariants=LedgerInvariants(state['sales_micro'], state['matched_micro']))
+        used_rates, warnings, stored_slices = dict(state['used_rates']), list(state['warnings']), state['slices']
+        sales_from, lots_from = state['sales_rows'], state['acq_rows']
+    else:
+        books = LotBooks(acq_df, book_columns)
+        used_rates, warnings, stored_slices = {}, [], SliceLedger.empty(book_columns)
+        sales_from, lots_from = 0, 0
+
+    new_sales = sales_df.iloc[sales_from:].reset_index(drop=True)
+    sale_idx, acq_idx, shares = books.match(new_sales)
+    slices = SliceLedger.concat([stored_slices, books.build_slices(new_sales, sale_idx, acq_idx, shares, rate_index, used_rates, warnings)])
+
+    # Per book: the date of the last sale seen and how many of its sold micro-shares found no lot.
+    sale_keys = book_keys(sales_df, sale_symbols(sales_df), book_columns)
+    sales_by_book = sales_df.assign(Micro_Shares=to_micro_shares(sales_df['Shares_Sold'])).groupby(
+        [sale_keys[col].to_numpy() for col in book_columns], sort=True, dropna=False
+    )
+    consumed = books.consumed
+    _write_state(state_file, {
+        'version': STATE_VERSION, 'book_columns': book_columns,
+        'sales_rows': len(sales_df), 'sales_digest': _prefix_digest(sales_df, len(sales_df)),
+        'acq_rows': len(lots), 'acq_digest': _prefix_digest(lots, len(lots)),
+        'consumed': consumed, 'lot_sold': books.lot_sold,
+        'last_sale': sales_by_book['Sale_Date'].max().to_dict(),
+        'unmatched': {key: int(sold - consumed.get(key, 0)) for key, sold in sales_by_book['Micro_Shares'].sum().items()},
+        'sales_micro': books.invariants.sales_micro, 'matched_micro': books.invariants.matched_micro,
+        'slices': slices, 'used_rates': used_rates, 'warnings': warnings,
+    })
+
+    if invariants is not None:
+        invariants.merge(books.invariants)
+    run_info = {
+        'Mode': 'Incremental' if reason is None else 'Full',
+        'Reason': reason or '',
+        'New Sales': len(new_sales),
+        'New Lots': len(acq_df) - lots_from,
+    }
+    return slices, books.lot_status(), used_rates, warnings, run_info
\ No newline at end of file
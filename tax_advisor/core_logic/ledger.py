@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence
+
+MICRO_SHARES = 1_000_000  # Integer share units per share; report quantities have at most 6 decimals.
+PAISE_PER_INR = 100
+LTCG_HOLDING_DAYS = 730
+
+def to_micro_shares(shares) -> np.ndarray:
+    """Share quantities as exact integer micro-shares."""
+    return np.rint(np.asarray(shares, dtype=float) * MICRO_SHARES).astype(np.int64)
+
+def _inr_in_paise(price_usd: np.ndarray, micro_shares: np.ndarray, ttbr: np.ndarray) -> np.ndarray:
+    """Value of `micro_shares` at a USD price and TTBR, rounded to whole paise."""
+    return np.rint(price_usd * ttbr * micro_shares * (PAISE_PER_INR / MICRO_SHARES)).astype(np.int64)
+
+class LedgerInvariants:
+    """Exact share totals kept up while sales are matched, so validations are O(1) integer comparisons.
+
+    `sales_micro` counts every share offered for matching, `matched_micro` every share placed in a slice,
+    and `min_remaining_micro` is the lowest remaining quantity any lot has reached (negative if oversold).
+    """
+    __slots__ = ('sales_micro', 'matched_micro', 'min_remaining_micro')
+
+    def __init__(self, sales_micro: int = 0, matched_micro: int = 0, min_remaining_micro: Optional[int] = None):
+        self.sales_micro, self.matched_micro, self.min_remaining_micro = sales_micro, matched_micro, min_remaining_micro
+
+    def record(self, sale_micro: np.ndarray, slice_micro: np.ndarray, lot_remaining_micro: np.ndarray):
+        """Adds a matched batch: the sales offered, the slices produced and the remaining shares of the lots touched."""
+        self.sales_micro += int(sale_micro.sum())
+        self.matched_micro += int(slice_micro.sum())
+        if len(lot_remaining_micro):
+            self.observe_lots(lot_remaining_micro)
+
+    def observe_lots(self, lot_remaining_micro: np.ndarray):
+        lowest = int(lot_remaining_micro.min())
+        self.min_remaining_micro = lowest if self.min_remaining_micro is None else min(self.min_remaining_micro, lowest)
+
+    def merge(self, other: 'LedgerInvariants'):
+        """Adds the totals of another book's invariants."""
+        self.sales_micro += other.sales_micro
+        self.matched_micro += other.matched_micro
+        if other.min_remaining_micro is not None:
+            self.observe_lots(np.array([other.min_remaining_micro]))
+
+    @property
+    def share_match(self) -> bool:
+        return self.sales_micro == self.matched_micro
+
+    @property
+    def oversold(self) -> bool:
+        return self.min_remaining_micro is not None and self.min_remaining_micro < 0
+
+    @classmethod
+    def from_ledger(cls, sales_df: pd.DataFrame, slices: 'SliceLedger', acq_status_df: pd.DataFrame) -> 'LedgerInvariants':
+        """Rebuilds the invariants from finished results, for callers that did not record them."""
+        invariants = cls()
+        remaining = acq_status_df['Remaining_Shares'] if 'Remaining_Shares' in acq_status_df.columns else []
+        invariants.record(to_micro_shares(sales_df['Shares_Sold']), slices.micro_shares, to_micro_shares(remaining))
+        return invariants
+
+class SliceLedger:
+    """Matched FIFO slices as parallel fixed-width arrays: integer micro-shares and paise, float prices and TTBRs.
+
+    `book_values` holds the lot book columns (e.g. 'Symbol') of each slice. Holding days, gain type and gain
+    totals are derived on demand; `to_frame` builds the report table.
+    """
+    __slots__ = ('sale_dates', 'acq_dates', 'micro_shares', 'sale_price', 'acq_price', 'sale_ttbr', 'acq_ttbr', 'proceeds_paise', 'cost_paise', 'book_values')
+    ARRAYS = __slots__[:-1]
+
+    def __init__(self, sale_dates, acq_dates, micro_shares, sale_price, acq_price, sale_ttbr, acq_ttbr, book_values: Optional[Dict[str, np.ndarray]] = None):
+        self.sale_dates, self.acq_dates = np.asarray(sale_dates), np.asarray(acq_dates)
+        self.micro_shares = np.asarray(micro_shares, dtype=np.int64)
+        self.sale_price, self.acq_price = np.asarray(sale_price, dtype=float), np.asarray(acq_price, dtype=float)
+        self.sale_ttbr, self.acq_ttbr = np.asarray(sale_ttbr, dtype=float), np.asarray(acq_ttbr, dtype=float)
+        self.proceeds_paise = _inr_in_paise(self.sale_price, self.micro_shares, self.sale_ttbr)
+        self.cost_paise = _inr_in_paise(self.acq_price, self.micro_shares, self.acq_ttbr)
+        self.book_values = dict(book_values or {})
+
+    @classmethod
+    def empty(cls, book_columns: Sequence[str] = ()) -> 'SliceLedger':
+        no_dates = np.array([], dtype='datetime64[ns]')
+        return cls(no_dates, no_dates, [], [], [], [], [], {col: np.array([], dtype=object) for col in book_columns})
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], book_values: Dict[str, np.ndarray]) -> 'SliceLedger':
+        """Rebuilds a ledger from its `ARRAYS`, as saved, without recomputing the paise amounts."""
+        ledger = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(ledger, name, arrays[name])
+        ledger.book_values = book_values
+        return ledger
+
+    @classmethod
+    def concat(cls, ledgers: Sequence['SliceLedger']) -> 'SliceLedger':
+        """The slices of every ledger, in order; they must share their book columns.
+
+        Empty ledgers are skipped, so an `empty()` placeholder cannot change the date resolution of real slices.
+        """
+        ledgers = [ledger for ledger in ledgers if len(ledger)] or list(ledgers[:1])
+        if len(ledgers) == 1:
+            return ledgers[0]
+        if not ledgers:
+            return cls.empty()
+        arrays = {name: np.concatenate([getattr(ledger, name) for ledger in ledgers]) for name in cls.ARRAYS}
+        book_values = {col: np.concatenate([ledger.book_values[col] for ledger in ledgers]) for col in ledgers[0].book_values}
+        return cls.from_arrays(arrays, book_values)
+
+    def take(self, positions: np.ndarray) -> 'SliceLedger':
+        """The slices at `positions`, in that order."""
+        arrays = {name: getattr(self, name)[positions] for name in self.ARRAYS}
+        return self.from_arrays(arrays, {col: values[positions] for col, values in self.book_values.items()})
+
+    def __len__(self) -> int:
+        return len(self.micro_shares)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS) + sum(values.nbytes for values in self.book_values.values())
+
+    @property
+    def profit_paise(self) -> np.ndarray:
+        return self.proceeds_paise - self.cost_paise
+
+    @property
+    def holding_days(self) -> np.ndarray:
+        return ((self.sale_dates - self.acq_dates) // np.timedelta64(1, 'D')).astype(np.int64)
+
+    @property
+    def is_long_term(self) -> np.ndarray:
+        return self.holding_days > LTCG_HOLDING_DAYS
+
+    def gain_components_paise(self) -> np.ndarray:
+        """Each slice's STCG, STCL, LTCG and LTCL in paise (losses as positive amounts), as a (4, slices) array."""
+        profit, is_long = self.profit_paise, self.is_long_term
+        gains, losses = np.maximum(profit, 0), np.maximum(-profit, 0)
+        zero = np.zeros_like(profit)
+        return np.vstack((np.where(is_long, zero, gains), np.where(is_long, zero, losses), np.where(is_long, gains, zero), np.where(is_long, losses, zero)))
+
+    def gain_totals(self) -> np.ndarray:
+        """STCG, STCL, LTCG and LTCL in INR, summed exactly in paise."""
+        return self.gain_components_paise().sum(axis=1) / PAISE_PER_INR
+
+    def to_frame(self) -> pd.DataFrame:
+        """The 'Profit Loss Summary' table, led by the book columns, with shares and INR amounts converted back to decimals."""
+        holding_days = self.holding_days
+        return pd.DataFrame({
+            **self.book_values,
+            'Sale_Date': self.sale_dates, 'Shares_Sold': self.micro_shares / MICRO_SHARES,
+            'Sale_Price_USD': self.sale_price, 'Acquisition_Price_USD': self.acq_price,
+            'Sale_TTBR': self.sale_ttbr, 'Acquisition_TTBR': self.acq_ttbr,
+            'Sale_Proceeds_INR': self.proceeds_paise / PAISE_PER_INR, 'Cost_of_Acquisition_INR': self.cost_paise / PAISE_PER_INR,
+            'Profit/Loss (INR)': self.profit_paise / PAISE_PER_INR,
+            'Holding Duration (Days)': holding_days,
+            'Gain_Type': np.where(holding_days > LTCG_HOLDING_DAYS, 'LTCG', 'STCG')
+        })
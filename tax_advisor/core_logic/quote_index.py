@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, Tuple
+
+class QuoteIndex:
+    """Quote history keyed by (symbol, date), sorted once so prices can be looked up for many lots at a time."""
+
+    def __init__(self, quotes: pd.DataFrame):
+        """`quotes` has one row per quote with 'Symbol', 'Quote_Date' and 'Price' columns, in report order."""
+        quotes = quotes.dropna(subset=['Price'])
+        self.symbols = np.array(sorted(quotes['Symbol'].unique()), dtype=object)
+
+        # The latest price follows the report's own row order, as the single-ticker lookup always did.
+        last_rows = quotes.drop_duplicates(subset='Symbol', keep='last').set_index('Symbol')['Price']
+        self._latest = np.append(last_rows.reindex(self.symbols).to_numpy(dtype=float), 0.0)
+
+        dated = quotes.dropna(subset=['Quote_Date']).sort_values(['Symbol', 'Quote_Date'], kind='stable')
+        codes = np.searchsorted(self.symbols, dated['Symbol'].to_numpy(dtype=object))
+        self._bounds = np.searchsorted(codes, np.arange(len(self.symbols) + 1))
+        self._dates = dated['Quote_Date'].to_numpy(dtype='datetime64[ns]')
+        self._prices = dated['Price'].to_numpy(dtype=float)
+
+    def _codes(self, symbols: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions of `symbols` in `self.symbols`; unknown symbols get the trailing sentinel position."""
+        symbols = np.array(list(symbols), dtype=object)
+        codes = np.minimum(np.searchsorted(self.symbols, symbols), max(len(self.symbols) - 1, 0))
+        found = self.symbols[codes] == symbols if len(self.symbols) else np.zeros(len(symbols), dtype=bool)
+        return np.where(found, codes, len(self.symbols)), found
+
+    def latest(self, symbols: Iterable) -> np.ndarray:
+        """Latest quoted price of each symbol, or 0 for symbols without quotes."""
+        codes, _ = self._codes(symbols)
+        return self._latest[codes]
+
+    def price_on(self, symbols: Iterable, dates: Iterable) -> np.ndarray:
+        """Last price quoted on or before each date for each symbol, or NaN where there is none."""
+        codes, found = self._codes(symbols)
+        dates = pd.DatetimeIndex(np.atleast_1d(dates)).values
+        prices = np.full(len(codes), np.nan)
+        for code in np.unique(codes[found]):
+            rows = found & (codes == code)
+            start, end = self._bounds[code], self._bounds[code + 1]
+            position = np.searchsorted(self._dates[start:end], dates[rows], side='right') - 1
+            prices[rows] = np.where(position >= 0, self._prices[start:end][np.maximum(position, 0)], np.nan)
+        return prices
\ No newline at end of file
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from typing import Tuple, Dict, List, Optional, Union
+from datetime import datetime
+
+FALLBACK_DAYS = 7
+
+class TTBRRateIndex:
+    """Resolves the month-end TTBR for every calendar month once, so lookups are plain array indexing."""
+
+    def __init__(self, rates: Dict[str, float]):
+        rate_keys = sorted(rates)
+        self._build(np.array(rate_keys, dtype='datetime64[D]'), np.array([rates[key] for key in rate_keys], dtype=float))
+        self._rates = rates
+
+    @classmethod
+    def from_arrays(cls, rate_dates: np.ndarray, rate_values: np.ndarray) -> 'TTBRRateIndex':
+        """Builds the index straight from ascending, unique rate dates and their TTBRs, such as the rate store's columns."""
+        index = cls.__new__(cls)
+        index._build(np.array(rate_dates, dtype='datetime64[D]'), np.array(rate_values, dtype=float))
+        index._rates = None
+        return index
+
+    def __len__(self) -> int:
+        return len(self.rate_dates)
+
+    @property
+    def rates(self) -> Dict[str, float]:
+        """Every rate keyed by its 'YYYY-MM-DD' date, as `get_inr_conversion_rate` takes them; built on first use."""
+        if self._rates is None:
+            self._rates = dict(zip(np.datetime_as_string(self.rate_dates).tolist(), self.rate_values.tolist()))
+        return self._rates
+
+    def _build(self, rate_dates: np.ndarray, rate_values: np.ndarray):
+        self.rate_dates, self.rate_values = rate_dates, rate_values
+        if len(rate_dates):
+            months = np.arange(rate_dates[0].astype('datetime64[M]'), rate_dates[-1].astype('datetime64[M]') + 1)
+        else:
+            months = np.array([], dtype='datetime64[M]')
+        self._first_month = months[0] if len(months) else np.datetime64('1970-01', 'M')
+        month_ends = (months + 1).astype('datetime64[D]') - 1
+
+        # Latest rate on or before each month-end, accepted only if it falls inside the fallback window.
+        position = np.searchsorted(rate_dates, month_ends, side='right') - 1
+        fallback_dates = rate_dates[np.maximum(position, 0)]
+        found = (position >= 0) & (fallback_dates > month_ends - FALLBACK_DAYS)
+
+        self._rate_keys = np.where(found, np.datetime_as_string(fallback_dates), None).astype(object)
+        self._month_rates = np.where(found, rate_values[np.maximum(position, 0)], np.nan)
+        self._warnings = [
+            {
+                'Required Date': required,
+                'Fallback Date Used': self._rate_keys[i],
+                'Rate': self._month_rates[i],
+                'Reason': 'Exact month-end rate not available (likely holiday/weekend).'
+            } if found[i] and fallback_dates[i] != month_ends[i] else None
+            for i, required in enumerate(np.datetime_as_string(month_ends))
+        ]
+
+    def lookup(self, dates, warnings: Optional[List] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the rate dates and TTBRs applicable to an array of transaction dates.
+
+        Fallback warnings for the months used are appended to `warnings`, once per required date.
+        """
+        months = pd.DatetimeIndex(np.atleast_1d(dates)).values.astype('datetime64[M]')
+        positions = (months - 1 - self._first_month).astype(np.int64)
+        valid = (positions >= 0) & (positions < len(self._month_rates))
+        positions = np.where(valid, positions, 0)
+        if len(self._month_rates):
+            valid &= ~np.isnan(self._month_rates[positions])
+        if not valid.all():
+            required = months[~valid][0].astype('datetime64[D]') - 1
+            raise ValueError(f"CRITICAL: Missing TTBR rate for required date: '{required}'")
+
+        if warnings is not None:
+            recorded = {warning['Required Date'] for warning in warnings}
+            for position in pd.unique(positions):
+                warning = self._warnings[position]
+                if warning is not None and warning['Required Date'] not in recorded:
+                    warnings.append(dict(warning))
+                    recorded.add(warning['Required Date'])
+        return self._rate_keys[positions], self._month_rates[positions]
+
+    def get_rate(self, transaction_date: datetime, warnings: Optional[List] = None) -> Tuple[str, float]:
+        """Single-date form of `lookup`, with the same result as `get_inr_conversion_rate`."""
+        rate_keys, rates = self.lookup([transaction_date], warnings)
+        return rate_keys[0], float(rates[0])
+
+def as_rate_index(ttbr_rates: Union[Dict[str, float], TTBRRateIndex]) -> TTBRRateIndex:
+    """Returns `ttbr_rates` as a rate index, building one from a plain rates dictionary if needed."""
+    return ttbr_rates if isinstance(ttbr_rates, TTBRRateIndex) else TTBRRateIndex(ttbr_rates)
\ No newline at end of file
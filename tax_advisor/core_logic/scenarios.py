@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, Optional
+from .ledger import SliceLedger
+from .tax_calculator import cumulative_gain_totals, tax_liability_from_totals, get_advance_tax_dates, advance_tax_payments
+
+# Scenarios are evaluated in blocks so the (scenarios, lots) arrays stay around this many elements.
+SCENARIO_BLOCK_ELEMENTS = 1 << 22
+
+def scenario_grid(price_multipliers: Iterable[float] = (1.0,), ttbr_shifts: Iterable[float] = (0.0,), other_incomes: Iterable[float] = (0.0,)) -> pd.DataFrame:
+    """Every combination of market price multiplier, TTBR shift (INR per USD) and income from other sources."""
+    prices, shifts, incomes = np.meshgrid(
+        np.asarray(list(price_multipliers), dtype=float), np.asarray(list(ttbr_shifts), dtype=float),
+        np.asarray(list(other_incomes), dtype=float), indexing='ij'
+    )
+    return pd.DataFrame({'Price_Multiplier': prices.ravel(), 'TTBR_Shift': shifts.ravel(), 'Other_Income_INR': incomes.ravel()})
+
+def _liquidation_totals(lots: pd.DataFrame, price_multipliers: np.ndarray, ttbr_shifts: np.ndarray) -> np.ndarray:
+    """STCG, STCL, LTCG and LTCL of selling every open lot in each scenario, as a (4, scenarios) array."""
+    shares = lots['Remaining_Shares'].to_numpy(dtype=float)
+    price = lots['Current_Market_Price_USD'].to_numpy(dtype=float)
+    sale_rate = lots['Sale_TTBR'].to_numpy(dtype=float)
+    cost = lots['Cost_Per_Share_INR'].to_numpy(dtype=float) * shares
+    is_long = (lots['Gain_Type'] == 'LTCG').to_numpy()
+
+    totals = np.zeros((4, len(price_multipliers)))
+    block = max(1, SCENARIO_BLOCK_ELEMENTS // max(len(shares), 1))
+    for start in range(0, len(price_multipliers), block):
+        rows = slice(start, start + block)
+        proceeds = (price_multipliers[rows, None] * price * shares) * (sale_rate + ttbr_shifts[rows, None])
+        gain = proceeds - cost
+        gains, losses = np.maximum(gain, 0.0), np.maximum(-gain, 0.0)
+        totals[:, rows] = (gains @ ~is_long, losses @ ~is_long, gains @ is_long, losses @ is_long)
+    return totals
+
+def evaluate_scenarios(slices: SliceLedger, lots: Optional[pd.DataFrame], grid: pd.DataFrame, fy_start_year: Optional[int] = None) -> pd.DataFrame:
+    """Tax liability and advance tax installments for every scenario in `grid`, from already-matched data.
+
+    `slices` is the ledger of realized slices. Each scenario sells every open lot in `lots` (from `value_open_lots`)
+    in full on their sale date, at `Price_Multiplier` times the quoted price and the TTBR plus `TTBR_Shift`; pass
+    None to only vary income. The sale counts only if it falls on or before the FY's last installment cut-off, for
+    the liability and the installments alike, so the installments add up to the liability.
+    Returns `grid` with the gain totals, set-off, surcharge, liability and one column per installment due date.
+    """
+    prices = grid['Price_Multiplier'].to_numpy(dtype=float)
+    shifts = grid['TTBR_Shift'].to_numpy(dtype=float)
+    incomes = grid['Other_Income_INR'].to_numpy(dtype=float)
+
+    q_ends, due_dates = get_advance_tax_dates(fy_start_year)
+    realized_by_cutoff = cumulative_gain_totals(slices, q_ends)
+    realized = slices.gain_totals()
+
+    hypothetical = np.zeros((4, len(grid)))
+    sold_by_cutoff = np.zeros(len(q_ends), dtype=bool)
+    if lots is not None and not lots.empty:
+        hypothetical = _liquidation_totals(lots, prices, shifts)
+        sold_by_cutoff = lots['Sale_Date'].iloc[0] <= pd.to_datetime(pd.Series(q_ends)).to_numpy()
+
+    liability = tax_liability_from_totals(*(realized[:, None] + hypothetical * sold_by_cutoff[-1]), incomes)
+    # (4, scenarios, cut-offs): realized gains to each cut-off, plus the liquidation once it has happened.
+    cumulative = realized_by_cutoff[:, None, :] + hypothetical[:, :, None] * sold_by_cutoff[None, None, :]
+    cum_tax = tax_liability_from_totals(*cumulative, incomes[:, None])['total_tax_liability']
+    payments = advance_tax_payments(cum_tax)
+
+    results = grid.reset_index(drop=True).copy()
+    for key in ('stcg', 'stcl', 'ltcg', 'ltcl', 'net_taxable_stcg', 'net_taxable_ltcg', 'surcharge_rate_applied', 'total_base_tax', 'total_surcharge', 'total_cess', 'total_tax_liability'):
+        results[key] = np.broadcast_to(liability[key], len(results))
+    for i, due_date in enumerate(due_dates):
+        results[f'Advance Tax Due {due_date:%Y-%m-%d}'] = payments[:, i]
+    return results
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Tuple, Dict, List, Iterable, Optional, Sequence, Union
+import config
+from .fifo_calculator import LotBooks
+from .ledger import LedgerInvariants, SliceLedger, PAISE_PER_INR
+from .rate_index import TTBRRateIndex, as_rate_index
+from .tax_calculator import tax_liability_from_totals, advance_tax_schedule_from_cumulative
+
+class CsvSliceSink:
+    """Appends matched slices to a CSV file as they are produced, so they never accumulate in memory.
+
+    The CSV stands in for the 'Profit Loss Summary' sheet, so each batch is converted with `SliceLedger.to_frame`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, slices: SliceLedger):
+        slices.to_frame().to_csv(self.path, mode='a', header=self.rows_written == 0, index=False)
+        self.rows_written += len(slices)
+
+class StreamingTaxAccumulator:
+    """Running STCG/STCL/LTCG/LTCL totals, overall and at each advance tax cut-off date, kept in whole paise."""
+
+    def __init__(self, cutoff_dates: List):
+        self.cutoffs = pd.to_datetime(pd.Series(cutoff_dates)).to_numpy()
+        self.totals_paise = np.zeros(4, dtype=np.int64)
+        self.cutoff_totals_paise = np.zeros((len(self.cutoffs), 4), dtype=np.int64)
+
+    @property
+    def totals(self) -> np.ndarray:
+        """The gain totals in INR, as `SliceLedger.gain_totals` gives for every slice seen so far."""
+        return self.totals_paise / PAISE_PER_INR
+
+    @property
+    def cutoff_totals(self) -> np.ndarray:
+        return self.cutoff_totals_paise / PAISE_PER_INR
+
+    def update(self, slices: SliceLedger):
+        components = slices.gain_components_paise()
+        self.totals_paise += components.sum(axis=1)
+        within_cutoff = slices.sale_dates[None, :] <= self.cutoffs[:, None]
+        self.cutoff_totals_paise += within_cutoff.astype(np.int64) @ components.T
+
+    def tax_data(self, other_income: float) -> Dict[str, float]:
+        """Same result as `calculate_tax_liability` over every slice seen so far."""
+        return {key: float(value) for key, value in tax_liability_from_totals(*self.totals, other_income).items()}
+
+    def advance_tax_schedule(self, other_income: float, due_dates: List) -> pd.DataFrame:
+        """Same result as `calculate_advance_tax_schedule` when built with its installment cut-off dates."""
+        cum_tax = tax_liability_from_totals(*self.cutoff_totals.T, other_income)['total_tax_liability']
+        return advance_tax_schedule_from_cumulative(cum_tax, due_dates)
+
+def stream_fifo_matching(sales_chunks: Iterable[pd.DataFrame], acq_df: pd.DataFrame, ttbr_rates: Union[Dict, TTBRRateIndex], sink: CsvSliceSink, accumulator: StreamingTaxAccumulator, book_columns: Optional[Sequence[str]] = None, invariants: Optional[LedgerInvariants] = None) -> Tuple[pd.DataFrame, Dict, List, Dict[str, float]]:
+    """FIFO-matches date-ordered sales chunks, sending slices to `sink` and their gains to `accumulator`.
+
+    Only the position reached in each lot book's queue is carried between chunks; each chunk is matched
+    against the lots still open at that point. Books are keyed as in `perform_fifo_matching`.
+    Exact share totals are recorded into `invariants` chunk by chunk when one is given.
+    """
+    books = LotBooks(acq_df, config.LOT_BOOK_COLUMNS if book_columns is None else book_columns, invariants=invariants)
+    rate_index = as_rate_index(ttbr_rates)
+    used_rates, warnings = {}, []
+    stats = {'Sales Rows': 0, 'Slices': 0}
+
+    for chunk in sales_chunks:
+        stats['Sales Rows'] += len(chunk)
+        sale_idx, acq_idx, shares = books.match(chunk)
+        if len(shares):
+            slices = books.build_slices(chunk, sale_idx, acq_idx, shares, rate_index, used_rates, warnings)
+            sink.write(slices)
+            accumulator.update(slices)
+            stats['Slices'] += len(slices)
+
+    return books.lot_status(), used_rates, warnings, stats
\ No newline at end of file
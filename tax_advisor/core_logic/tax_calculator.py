@@ -1,61 +1,108 @@
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Union
+from datetime import datetime, date
 import config
+from .ledger import SliceLedger, PAISE_PER_INR
 
-def calculate_tax_liability(df: pd.DataFrame, other_income: float) -> Dict[str, Any]:
-    """Calculates total tax liability based on correct Indian tax set-off rules."""
-    # Separate gains and losses
-    stcg = df[(df['Gain_Type'] == 'STCG') & (df['Profit/Loss (INR)'] > 0)]['Profit/Loss (INR)'].sum()
-    stcl = abs(df[(df['Gain_Type'] == 'STCG') & (df['Profit/Loss (INR)'] < 0)]['Profit/Loss (INR)'].sum())
-    ltcg = df[(df['Gain_Type'] == 'LTCG') & (df['Profit/Loss (INR)'] > 0)]['Profit/Loss (INR)'].sum()
-    ltcl = abs(df[(df['Gain_Type'] == 'LTCG') & (df['Profit/Loss (INR)'] < 0)]['Profit/Loss (INR)'].sum())
+ADVANCE_TAX_INSTALLMENTS = [('15-06', '15-06', 0.15), ('15-09', '15-09', 0.45), ('15-12', '15-12', 0.75), ('31-03', '15-03', 1.00)]
+
+def gain_totals(realized: Union[SliceLedger, np.ndarray]) -> np.ndarray:
+    """STCG, STCL, LTCG and LTCL totals of the realized slices in INR, as a (4,) array.
+
+    Takes the slice ledger, whose totals are exact sums in paise, or totals already accumulated, such as
+    `StreamingTaxAccumulator.totals`.
+    """
+    if isinstance(realized, SliceLedger):
+        return realized.gain_totals()
+    return np.asarray(realized, dtype=float)
 
+def surcharge_rates(total_income) -> np.ndarray:
+    """Looks up the surcharge rate for an array of total incomes from `config.SURCHARGE_SLABS`."""
+    limits = np.array(sorted(config.SURCHARGE_SLABS), dtype=float)
+    rates = np.concatenate(([0.0], [config.SURCHARGE_SLABS[limit] for limit in sorted(config.SURCHARGE_SLABS)]))
+    return rates[np.searchsorted(limits, total_income, side='left')]
+
+def tax_liability_from_totals(stcg, stcl, ltcg, ltcl, other_income) -> Dict[str, np.ndarray]:
+    """Applies the set-off, surcharge and cess rules to (arrays of) gross gain and loss totals."""
     # Apply Set-Off Rules
-    ltcg_after_ltcl = max(0, ltcg - ltcl)
-    stcg_after_stcl = max(0, stcg - stcl)
-    stcl_remaining = max(0, stcl - stcg)
-    ltcg_after_all_setoffs = max(0, ltcg_after_ltcl - stcl_remaining)
-    
+    ltcg_after_ltcl = np.maximum(0, ltcg - ltcl)
+    stcg_after_stcl = np.maximum(0, stcg - stcl)
+    stcl_remaining = np.maximum(0, stcl - stcg)
+    ltcg_after_all_setoffs = np.maximum(0, ltcg_after_ltcl - stcl_remaining)
+
     net_taxable_ltcg, net_taxable_stcg = ltcg_after_all_setoffs, stcg_after_stcl
-    total_capital_gains = net_taxable_ltcg + net_taxable_stcg
-    total_income = other_income + total_capital_gains
-    
-    # Determine Surcharge Rate
-    surcharge_rate = 0.0
-    for limit, rate in sorted(config.SURCHARGE_SLABS.items()):
-        if total_income > limit:
-            surcharge_rate = rate
-    
+    total_income = other_income + net_taxable_ltcg + net_taxable_stcg
+    surcharge_rate = surcharge_rates(total_income)
+
     base_tax = (net_taxable_stcg * config.TAX_RATES['stcg']) + (net_taxable_ltcg * config.TAX_RATES['ltcg'])
     surcharge = base_tax * surcharge_rate
     cess = (base_tax + surcharge) * config.TAX_RATES['cess']
     total_tax_liability = base_tax + surcharge + cess
-    
+
     return {
         "stcg": stcg, "stcl": stcl, "ltcg": ltcg, "ltcl": ltcl,
         "net_taxable_stcg": net_taxable_stcg, "net_taxable_ltcg": net_taxable_ltcg,
-        "surcharge_rate_applied": surcharge_rate, "total_base_tax": base_tax, 
+        "surcharge_rate_applied": surcharge_rate, "total_base_tax": base_tax,
         "total_surcharge": surcharge, "total_cess": cess, "total_tax_liability": total_tax_liability
     }
 
-def calculate_advance_tax_schedule(summary_df: pd.DataFrame, other_income: float) -> pd.DataFrame:
-    """Calculates advance tax installments using the cumulative method."""
-    fy_start_year = pd.Timestamp.now().year if pd.Timestamp.now().month >= 4 else pd.Timestamp.now().year - 1
-    q_ends = [pd.to_datetime(f'{d}-{fy_start_year if d.split("-")[1] != "03" else fy_start_year + 1}', format='%d-%m-%Y') for d in ['15-06', '15-09', '15-12', '31-03']]
-    due_dates = [d.date() for d in [pd.to_datetime(f'{d}-{fy_start_year if d.split("-")[1] != "03" else fy_start_year + 1}', format='%d-%m-%Y') for d in ['15-06', '15-09', '15-12', '15-03']]]
-    
-    cum_tax_q1 = calculate_tax_liability(summary_df[summary_df['Sale_Date'] <= q_ends[0]], other_income)['total_tax_liability']
-    cum_tax_q2 = calculate_tax_liability(summary_df[summary_df['Sale_Date'] <= q_ends[1]], other_income)['total_tax_liability']
-    cum_tax_q3 = calculate_tax_liability(summary_df[summary_df['Sale_Date'] <= q_ends[2]], other_income)['total_tax_liability']
-    cum_tax_q4 = calculate_tax_liability(summary_df[summary_df['Sale_Date'] <= q_ends[3]], other_income)['total_tax_liability']
-
-    paid_so_far = 0
-    payment_q1 = cum_tax_q1 * 0.15; paid_so_far += payment_q1
-    payment_q2 = (cum_tax_q2 * 0.45) - paid_so_far; paid_so_far += payment_q2
-    payment_q3 = (cum_tax_q3 * 0.75) - paid_so_far; paid_so_far += payment_q3
-    payment_q4 = (cum_tax_q4 * 1.00) - paid_so_far
-
-    schedule = pd.DataFrame({'Installment Due Date': due_dates,'Amount to Pay (INR)': [payment_q1, payment_q2, payment_q3, payment_q4]})
-    schedule['Amount to Pay (INR)'] = schedule['Amount to Pay (INR)'].clip(lower=0)
-    return schedule
\ No newline at end of file
+def calculate_tax_liability(slices: SliceLedger, other_income: float) -> Dict[str, Any]:
+    """Calculates total tax liability based on correct Indian tax set-off rules."""
+    stcg, stcl, ltcg, ltcl = slices.gain_totals()
+    return {key: float(value) for key, value in tax_liability_from_totals(stcg, stcl, ltcg, ltcl, other_income).items()}
+
+def cumulative_gain_totals(slices: SliceLedger, cutoff_dates: List) -> np.ndarray:
+    """STCG, STCL, LTCG and LTCL in INR over all sales up to each cut-off date, as a (4, cut-offs) array."""
+    if len(slices) == 0:
+        return np.zeros((4, len(cutoff_dates)))
+    order = np.argsort(slices.sale_dates, kind='stable')
+    sale_dates = slices.sale_dates[order]
+    components = slices.gain_components_paise()[:, order]
+    running = np.concatenate((np.zeros((4, 1), dtype=np.int64), np.cumsum(components, axis=1)), axis=1)
+
+    cutoffs = pd.to_datetime(pd.Series(cutoff_dates)).to_numpy().astype(sale_dates.dtype)
+    return running[:, np.searchsorted(sale_dates, cutoffs, side='right')] / PAISE_PER_INR
+
+def calculate_cumulative_tax_liability(slices: SliceLedger, cutoff_dates: List, other_income: float) -> pd.DataFrame:
+    """Calculates the liability on all sales up to each cut-off date in a single sorted pass."""
+    stcg, stcl, ltcg, ltcl = cumulative_gain_totals(slices, cutoff_dates)
+    cumulative = pd.DataFrame(tax_liability_from_totals(stcg, stcl, ltcg, ltcl, other_income))
+    cumulative.insert(0, 'Cut-off Date', pd.to_datetime(pd.Series(cutoff_dates)).values)
+    return cumulative
+
+def get_financial_year_start(today: Optional[date] = None) -> int:
+    """Returns the starting calendar year of the financial year containing `today` (default: now)."""
+    today = today or pd.Timestamp.now()
+    return today.year if today.month >= 4 else today.year - 1
+
+def get_advance_tax_dates(fy_start_year: Optional[int] = None) -> Tuple[List[pd.Timestamp], List[date]]:
+    """Returns the cumulative cut-off date and the due date of each advance tax installment in the FY."""
+    if fy_start_year is None:
+        fy_start_year = get_financial_year_start()
+    year_of = lambda d: fy_start_year if d.split("-")[1] != "03" else fy_start_year + 1
+    q_ends = [pd.to_datetime(f'{q_end}-{year_of(q_end)}', format='%d-%m-%Y') for q_end, _, _ in ADVANCE_TAX_INSTALLMENTS]
+    due_dates = [pd.to_datetime(f'{due}-{year_of(due)}', format='%d-%m-%Y').date() for _, due, _ in ADVANCE_TAX_INSTALLMENTS]
+    return q_ends, due_dates
+
+def advance_tax_payments(cum_tax: np.ndarray) -> np.ndarray:
+    """Amount due per installment from the cumulative liability at each cut-off; the last axis is the installment."""
+    cumulative_share = np.array([share for _, _, share in ADVANCE_TAX_INSTALLMENTS])
+    cum_tax = np.asarray(cum_tax, dtype=float)
+
+    # Each installment tops the amount paid so far up to the cumulative share of the liability to date.
+    payments = np.diff(cum_tax * cumulative_share, axis=-1, prepend=0.0)
+    return np.clip(payments, 0, None)
+
+def advance_tax_schedule_from_cumulative(cum_tax: np.ndarray, due_dates: List[date]) -> pd.DataFrame:
+    """Turns the cumulative liability at each installment cut-off into the amount due per installment."""
+    return pd.DataFrame({'Installment Due Date': due_dates,'Amount to Pay (INR)': advance_tax_payments(cum_tax)})
+
+def calculate_advance_tax_schedule(slices: SliceLedger, other_income: float, fy_start_year: Optional[int] = None) -> pd.DataFrame:
+    """Calculates advance tax installments using the cumulative method.
+
+    `fy_start_year` selects the financial year (e.g. 2024 for FY 2024-25); it defaults to the current one.
+    """
+    q_ends, due_dates = get_advance_tax_dates(fy_start_year)
+    cum_tax = calculate_cumulative_tax_liability(slices, q_ends, other_income)['total_tax_liability'].to_numpy()
+    return advance_tax_schedule_from_cumulative(cum_tax, due_dates)
\ No newline at end of file
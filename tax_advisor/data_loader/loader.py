@@ -1,53 +1,311 @@
+import logging
+import os
+import csv
+import json
+import time
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 import requests
 import io
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Iterable, Iterator, List, Optional
 from datetime import datetime, timedelta
-from utils.helpers import clean_currency
+import config
+from utils.helpers import clean_currency, clean_currency_column
+from core_logic.rate_index import TTBRRateIndex
+from core_logic.quote_index import QuoteIndex
+
+logger = logging.getLogger(__name__)
+
+_http_session = requests.Session()
+RATE_CACHE_DTYPE = np.dtype([('date', 'datetime64[D]'), ('tt_buy', 'float64')])
+
+def _read_ttbr_csv(source: str) -> pd.DataFrame:
+    """Reads the TTBR CSV from a GitHub URL or a local file path, one row per date."""
+    if os.path.exists(source):
+        rates_df = pd.read_csv(source)
+    else:
+        raw_url = source.replace('github.com', 'raw.githubusercontent.com').replace('/blob/', '/')
+        response = _http_session.get(raw_url)
+        response.raise_for_status()
+        rates_df = pd.read_csv(io.StringIO(response.text))
+    rates_df['DATE'] = pd.to_datetime(rates_df['DATE']).dt.normalize()
+    return rates_df.drop_duplicates(subset='DATE', keep='last').sort_values('DATE')
 
 def download_and_load_ttbr_rates(url: str) -> Dict[str, float]:
     """Downloads the TTBR rates CSV and loads it into a dictionary."""
-    print(f"Downloading TTBR rates from source...")
+    logger.info("Downloading TTBR rates from source...")
     try:
-        raw_url = url.replace('github.com', 'raw.githubusercontent.com').replace('/blob/', '/')
-        response = requests.get(raw_url)
-        response.raise_for_status()
-        
-        rates_df = pd.read_csv(io.StringIO(response.text))
-        rates_df['DATE'] = pd.to_datetime(rates_df['DATE'])
-        
-        print("✅ TTBR rates downloaded successfully.")
+        rates_df = _read_ttbr_csv(url)
+        logger.info("TTBR rates downloaded successfully.")
         return pd.Series(rates_df['TT BUY'].values, index=rates_df['DATE'].dt.strftime('%Y-%m-%d')).to_dict()
     except Exception as e:
         raise ConnectionError(f"Failed to download or parse the exchange rate file. Error: {e}")
 
-def load_and_clean_data(sales_file: str, acq_file: str, quote_file: str) -> Tuple[pd.DataFrame, pd.DataFrame, float]:
-    """Loads and cleans all necessary local input files."""
+def _cache_source_file(cache_file: str) -> str:
+    return f"{cache_file}.source.json"
+
+def _normalized_source(source: str) -> str:
+    return os.path.abspath(source) if os.path.exists(source) else source
+
+def _read_rate_cache(cache_file: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """Memory-maps the on-disk rate store, with the source it was built from.
+
+    Returns (None, None) if it does not exist yet; the source is None if the store predates source tracking.
+    """
+    if not os.path.exists(cache_file):
+        return None, None
     try:
-        sales_df = pd.read_csv(sales_file, skiprows=2, skipfooter=1, engine='python')
-        acq_df = pd.read_csv(acq_file, skiprows=1, skipfooter=1, engine='python')
-        quote_df = pd.read_csv(quote_file, skiprows=1).dropna(how='all')
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"File not found: {e}. Ensure all CSVs are in the correct path.") from e
+        with open(_cache_source_file(cache_file)) as f:
+            cached_source = json.load(f)['source']
+    except (OSError, ValueError, KeyError):
+        cached_source = None
+    return np.load(cache_file, mmap_mode='r'), cached_source
 
-    # Clean data
+def _refresh_rate_cache(source: str, cache_file: str, cached: Optional[np.ndarray]) -> np.ndarray:
+    """Appends the source rows newer than the last stored date to the rate store, or builds it if `cached` is None."""
+    logger.info("Refreshing TTBR rate cache from source...")
+    try:
+        rates_df = _read_ttbr_csv(source)
+    except Exception as e:
+        raise ConnectionError(f"Failed to download or parse the exchange rate file. Error: {e}")
+
+    new_dates = rates_df['DATE'].values.astype('datetime64[D]')
+    if cached is not None and len(cached):
+        newer = new_dates > cached['date'][-1]
+        rates_df, new_dates = rates_df[newer], new_dates[newer]
+
+    new_rows = np.empty(len(rates_df), dtype=RATE_CACHE_DTYPE)
+    new_rows['date'], new_rows['tt_buy'] = new_dates, rates_df['TT BUY'].to_numpy(dtype=float)
+    store = new_rows if cached is None else np.concatenate((np.asarray(cached), new_rows))
+
+    temp_file = f"{cache_file}.tmp"
+    with open(temp_file, 'wb') as f:
+        np.save(f, store)
+    os.replace(temp_file, cache_file)
+    with open(_cache_source_file(cache_file), 'w') as f:
+        json.dump({'source': _normalized_source(source)}, f)
+    logger.info(f"TTBR rate cache updated with {len(new_rows)} new rows.", extra={'new_rows': len(new_rows)})
+    return store
+
+def load_ttbr_rates(source: str, cache_file: str, required_dates: Optional[Iterable] = None, refresh: bool = False, offline: bool = False) -> TTBRRateIndex:
+    """Loads TTBR rates from the local rate store into a rate index, refreshing the store from `source` only when needed.
+
+    The store is refreshed when `refresh` is set, when it does not exist, or when it does not cover
+    `required_dates`; it is rebuilt from scratch when it was built from a different source. In `offline`
+    mode the source is never contacted, and a missing store, another source or missing coverage is an error.
+    """
+    cached, cached_source = _read_rate_cache(cache_file)
+    if offline and cached is None:
+        raise FileNotFoundError(f"Offline mode: TTBR rate cache '{cache_file}' not found. Run once with network access to build it.")
+    if cached is not None and cached_source != _normalized_source(source):
+        if offline:
+            raise ValueError(f"Offline mode: TTBR rate cache '{cache_file}' was built from '{cached_source}', not '{source}'. Run once with network access to rebuild it.")
+        logger.info(f"TTBR rate cache '{cache_file}' was built from another source; rebuilding it.", extra={'cached_source': cached_source})
+        cached = None
+    if not offline and (refresh or cached is None):
+        cached = _refresh_rate_cache(source, cache_file, cached)
+
+    ttbr_rates = TTBRRateIndex.from_arrays(cached['date'], cached['tt_buy'])
+    if required_dates is None:
+        return ttbr_rates
+    try:
+        ttbr_rates.lookup(list(required_dates))
+    except ValueError as e:
+        if offline:
+            raise ValueError(f"Offline mode: TTBR rate cache '{cache_file}' does not cover all transactions. {e}") from e
+        cached = _refresh_rate_cache(source, cache_file, cached)
+        ttbr_rates = TTBRRateIndex.from_arrays(cached['date'], cached['tt_buy'])
+    return ttbr_rates
+
+SALES_COLUMNS = ['Sale_Date', 'Sale_Price', 'Shares_Sold', 'Symbol', 'Gross_Proceeds', 'Acquisition_Date_in_Report']
+ACQ_COLUMNS = ['Vest_Date', 'Order_Number', 'Plan', 'Type', 'Status', 'Acquisition_Price', 'Quantity', 'Net_Cash_Proceeds', 'Shares_Acquired', 'Tax_Payment_Method']
+QUOTE_COLUMNS = ['Fund', 'Quote_Date', 'Price']
+CSV_ENGINES = ('python', 'c', 'pyarrow')
+
+def _report_dtypes(header_line: str, columns: List[str], currency_columns: List[str], float_columns: List[str] = ()) -> Dict[str, type]:
+    """Maps the report's own header names to declared dtypes: currency columns to `str`, so they are read as
+    text, and share quantities to `float`, so the parser does not infer them."""
+    header = next(csv.reader([header_line]), [])
+    dtypes = {col: str for col in currency_columns}
+    dtypes.update({col: float for col in float_columns})
+    return {header[columns.index(col)]: dtype for col, dtype in dtypes.items() if columns.index(col) < len(header)}
+
+def _read_report(file: str, skiprows: int, skipfooter: int, columns: List[str], currency_columns: List[str], engine: str, float_columns: List[str] = ()) -> pd.DataFrame:
+    """Reads a brokerage report with the C or pyarrow parser by trimming the header and footer lines first.
+
+    Line handling mirrors `engine='python'` with `skiprows`/`skipfooter`; currency columns are read as text
+    and `float_columns` as float64.
+    """
+    with open(file, newline='') as f:
+        text = f.read()
+    start = 0
+    for _ in range(skiprows):
+        start = text.index('\n', start) + 1
+    end = len(text)
+    for _ in range(skipfooter):
+        end = text.rfind('\n', start, end - 1 if text.endswith('\n', start, end) else end) + 1
+    body = text[start:end]
+    return pd.read_csv(io.StringIO(body), engine=engine, dtype=_report_dtypes(body[:body.find('\n')], columns, currency_columns, float_columns))
+
+def _clean_currency_columns(df: pd.DataFrame, columns: List[str], engine: str):
+    for col in columns:
+        df[col] = df[col].apply(clean_currency) if engine == 'python' else clean_currency_column(df[col])
+
+def _clean_sales(sales_df: pd.DataFrame, engine: str, date_format: Optional[str] = None) -> pd.DataFrame:
     sales_df.dropna(how='all', inplace=True)
-    acq_df.dropna(how='all', inplace=True)
-    sales_df.columns = ['Sale_Date', 'Sale_Price', 'Shares_Sold', 'Symbol', 'Gross_Proceeds', 'Acquisition_Date_in_Report']
-    acq_df.columns = ['Vest_Date', 'Order_Number', 'Plan', 'Type', 'Status', 'Acquisition_Price', 'Quantity', 'Net_Cash_Proceeds', 'Shares_Acquired', 'Tax_Payment_Method']
-    
-    for col in ['Sale_Price', 'Gross_Proceeds', 'Acquisition_Price', 'Net_Cash_Proceeds']:
-        df = sales_df if col in sales_df.columns else acq_df
-        df[col] = df[col].apply(clean_currency)
-    
+    sales_df.columns = SALES_COLUMNS
+    _clean_currency_columns(sales_df, ['Sale_Price', 'Gross_Proceeds'], engine)
     sales_df['Shares_Sold'] = pd.to_numeric(sales_df['Shares_Sold'])
+    sales_df['Sale_Date'] = pd.to_datetime(sales_df['Sale_Date'], format=date_format or config.INPUT_DATE_FORMAT)
+    return sales_df
+
+def _clean_acquisitions(acq_df: pd.DataFrame, engine: str, date_format: Optional[str] = None) -> pd.DataFrame:
+    acq_df.dropna(how='all', inplace=True)
+    acq_df.columns = ACQ_COLUMNS
+    _clean_currency_columns(acq_df, ['Acquisition_Price', 'Net_Cash_Proceeds'], engine)
     acq_df['Shares_Acquired'] = pd.to_numeric(acq_df['Shares_Acquired'])
-    sales_df['Sale_Date'] = pd.to_datetime(sales_df['Sale_Date'])
-    acq_df['Vest_Date'] = pd.to_datetime(acq_df['Vest_Date'])
+    acq_df['Vest_Date'] = pd.to_datetime(acq_df['Vest_Date'], format=date_format or config.INPUT_DATE_FORMAT)
+    return acq_df
+
+def portfolio_symbols() -> List[str]:
+    """Every ticker a lot can belong to: `config.DEFAULT_SYMBOL` and the values of `config.PLAN_SYMBOLS`."""
+    return list(dict.fromkeys([config.DEFAULT_SYMBOL, *config.PLAN_SYMBOLS.values()]))
+
+def _build_quote_index(quote_df: pd.DataFrame, engine: str, date_format: Optional[str] = None) -> QuoteIndex:
+    """Indexes the quote history by ticker and date; a row belongs to each portfolio ticker its Fund contains.
+
+    `config.QUOTE_FUND_PATTERNS` can give a ticker a regex to match instead, such as a whole-word pattern.
+    """
+    quote_df.columns = QUOTE_COLUMNS
+    prices = quote_df['Price'].apply(clean_currency) if engine == 'python' else clean_currency_column(quote_df['Price'])
+    dates = pd.to_datetime(quote_df['Quote_Date'], format=date_format or config.INPUT_DATE_FORMAT, errors='coerce')
+    quotes = []
+    for symbol in portfolio_symbols():
+        pattern = config.QUOTE_FUND_PATTERNS.get(symbol)
+        rows = quote_df['Fund'].str.contains(pattern or symbol, regex=pattern is not None, na=False)
+        quotes.append(pd.DataFrame({'Symbol': symbol, 'Quote_Date': dates[rows], 'Price': prices[rows]}))
+    return QuoteIndex(pd.concat(quotes, ignore_index=True))
+
+def load_and_clean_data(sales_file: str, acq_file: str, quote_file: str, engine: str = 'python', timings: Optional[Dict[str, float]] = None) -> Tuple[pd.DataFrame, pd.DataFrame, QuoteIndex]:
+    """Loads and cleans all necessary local input files.
+
+    `engine='python'` is the original parser path; 'c' or 'pyarrow' trim the report headers and footers
+    up front and clean currency columns with vectorized string operations, producing identical frames.
+    Each report's date format is detected once from its first rows unless `config.INPUT_DATE_FORMAT` is set.
+    Per-stage parse times in seconds are recorded into `timings` when a dict is given.
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}'. Choose one of: {', '.join(CSV_ENGINES)}")
+    timings = {} if timings is None else timings
+    stage_start = time.perf_counter()
+    try:
+        if engine == 'python':
+            sales_df = pd.read_csv(sales_file, skiprows=2, skipfooter=1, engine='python')
+            acq_df = pd.read_csv(acq_file, skiprows=1, skipfooter=1, engine='python')
+            quote_df = pd.read_csv(quote_file, skiprows=1).dropna(how='all')
+        else:
+            sales_df = _read_report(sales_file, 2, 1, SALES_COLUMNS, ['Sale_Price', 'Gross_Proceeds'], engine, ['Shares_Sold'])
+            acq_df = _read_report(acq_file, 1, 1, ACQ_COLUMNS, ['Acquisition_Price', 'Net_Cash_Proceeds'], engine, ['Shares_Acquired'])
+            quote_df = _read_report(quote_file, 1, 0, QUOTE_COLUMNS, ['Price'], engine).dropna(how='all')
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"File not found: {e}. Ensure all CSVs are in the correct path.") from e
+    timings['read_csv'] = time.perf_counter() - stage_start
+
+    # Clean data
+    stage_start = time.perf_counter()
+    sales_df = _clean_sales(sales_df, engine, _report_date_format(sales_df))
+    timings['clean_sales'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    acq_df = _clean_acquisitions(acq_df, engine, _report_date_format(acq_df))
+    timings['clean_releases'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    quotes = _build_quote_index(quote_df, engine, _report_date_format(quote_df, column=1))
+    timings['clean_quotes'] = time.perf_counter() - stage_start
 
-    quote_df.columns = ['Fund', 'Quote_Date', 'Price']
-    quote_df = quote_df[quote_df['Fund'].str.contains("GOOG", na=False)]
-    quote_df['Price'] = quote_df['Price'].apply(clean_currency)
-    latest_price = quote_df['Price'].iloc[-1] if not quote_df.empty else 0
+    return sales_df.sort_values(by='Sale_Date', kind='stable').reset_index(drop=True), acq_df.sort_values(by='Vest_Date', kind='stable').reset_index(drop=True), quotes
+
+def load_acquisitions_and_price(acq_file: str, quote_file: str, engine: str = 'c', timings: Optional[Dict[str, float]] = None) -> Tuple[pd.DataFrame, QuoteIndex]:
+    """Loads the releases and quote reports only, for pipelines that stream the sales report separately."""
+    timings = {} if timings is None else timings
+    stage_start = time.perf_counter()
+    try:
+        acq_df = _read_report(acq_file, 1, 1, ACQ_COLUMNS, ['Acquisition_Price', 'Net_Cash_Proceeds'], engine, ['Shares_Acquired'])
+        quote_df = _read_report(quote_file, 1, 0, QUOTE_COLUMNS, ['Price'], engine).dropna(how='all')
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"File not found: {e}. Ensure all CSVs are in the correct path.") from e
+    timings['read_csv'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    acq_df = _clean_acquisitions(acq_df, engine, _report_date_format(acq_df))
+    timings['clean_releases'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    quotes = _build_quote_index(quote_df, engine, _report_date_format(quote_df, column=1))
+    timings['clean_quotes'] = time.perf_counter() - stage_start
+    return acq_df.sort_values(by='Vest_Date', kind='stable').reset_index(drop=True), quotes
+
+def _infer_date_format(values: pd.Series, samples: int = 20) -> Optional[str]:
+    """Picks one date format for a whole report from its first values, so rows and chunks cannot disagree."""
+    candidates = values.dropna().unique()[:samples]
+    for value in candidates:
+        date_format = guess_datetime_format(str(value))
+        if date_format is None:
+            continue
+        try:
+            pd.to_datetime(pd.Series(candidates), format=date_format)
+            return date_format
+        except ValueError:
+            continue
+    return None
+
+def _report_date_format(report_df: pd.DataFrame, column: int = 0) -> Optional[str]:
+    """`config.INPUT_DATE_FORMAT`, or the format detected once from the report's date column (by position)."""
+    if config.INPUT_DATE_FORMAT or report_df.empty:
+        return config.INPUT_DATE_FORMAT
+    return _infer_date_format(report_df.iloc[:, column])
+
+def _iter_line_batches(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Yields lists of up to `size` lines, holding back the final line (the report footer)."""
+    pending, batch = None, []
+    for line in lines:
+        if pending is not None:
+            batch.append(pending)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        pending = line
+    if batch:
+        yield batch
+
+def iter_sales_chunks(sales_file: str, chunksize: int, engine: str = 'c') -> Iterator[pd.DataFrame]:
+    """Yields the cleaned Capital Gains Report in chunks of `chunksize` rows without reading it whole.
+
+    The report must already be in ascending sale-date order; a ValueError is raised otherwise.
+    """
+    try:
+        f = open(sales_file, newline='')
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"File not found: {e}. Ensure all CSVs are in the correct path.") from e
 
-    return sales_df.sort_values(by='Sale_Date').reset_index(drop=True), acq_df.sort_values(by='Vest_Date').reset_index(drop=True), latest_price
\ No newline at end of file
+    with f:
+        for _ in range(2):
+            f.readline()
+        header = f.readline()
+        dtypes = _report_dtypes(header, SALES_COLUMNS, ['Sale_Price', 'Gross_Proceeds'], ['Shares_Sold'])
+        last_date, date_format = None, None
+        for lines in _iter_line_batches(f, chunksize):
+            chunk = pd.read_csv(io.StringIO(header + ''.join(lines)), engine=engine, dtype=dtypes)
+            if date_format is None:
+                date_format = _report_date_format(chunk)
+            chunk = _clean_sales(chunk, engine, date_format)
+            if chunk.empty:
+                continue
+            dates = chunk['Sale_Date']
+            if not dates.is_monotonic_increasing or (last_date is not None and dates.iloc[0] < last_date):
+                raise ValueError(f"'{sales_file}' is not in ascending sale-date order; sort it or use the in-memory pipeline.")
+            last_date = dates.iloc[-1]
+            chunk['Shares_Sold'] = chunk['Shares_Sold'].astype(float)
+            yield chunk.reset_index(drop=True)
\ No newline at end of file
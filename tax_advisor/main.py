@@ -1,51 +1,204 @@
 # tax_advisor/main.py
 
+import os
+import logging
+import numpy as np
 import pandas as pd
 import config
-from data_loader.loader import download_and_load_ttbr_rates, load_and_clean_data
+from typing import Dict, Any, List, Optional, Tuple, Union
+from datetime import datetime
+from data_loader.loader import load_ttbr_rates, load_and_clean_data, load_acquisitions_and_price, iter_sales_chunks
 from core_logic.fifo_calculator import perform_fifo_matching
-from core_logic.tax_calculator import calculate_tax_liability, calculate_advance_tax_schedule
-from core_logic.financial_strategy import generate_loss_harvesting_report
-from reporting.excel_report import generate_excel_report
-from utils.helpers import perform_validations
+from core_logic.incremental import perform_fifo_matching_incremental
+from core_logic.rate_index import TTBRRateIndex
+from core_logic.quote_index import QuoteIndex
+from core_logic.ledger import LedgerInvariants, SliceLedger
+from core_logic.streaming import CsvSliceSink, StreamingTaxAccumulator, stream_fifo_matching
+from core_logic.tax_calculator import calculate_tax_liability, calculate_advance_tax_schedule, get_advance_tax_dates
+from core_logic.financial_strategy import generate_loss_harvesting_report, value_open_lots, optimize_loss_harvesting
+from reporting.excel_report import generate_excel_report, export_report_tables
+from utils.helpers import perform_validations, validate_totals
+from utils.profiling import RunProfiler, configure_logging
 
-def main():
-    """Main function to run the entire capital gains and tax calculation process."""
-    try:
-        # Step 1: Load all data
-        ttbr_rates = download_and_load_ttbr_rates(config.TTBR_RATES_URL)
-        sales_df, acq_df, latest_price = load_and_clean_data(
-            config.CAPITAL_GAINS_FILE, config.RELEASES_FILE, config.QUOTE_HISTORY_FILE
+logger = logging.getLogger(__name__)
+
+def write_reports(output_file: str, slices: Optional[SliceLedger] = None, **report):
+    """Writes the Excel report with the configured backend, plus any configured table exports beside it.
+
+    `slices` becomes the 'Profit Loss Summary' table; it is None when the slices were streamed to a CSV.
+    """
+    report['summary_df'] = slices.to_frame() if slices is not None else None
+    options = dict(original_reports=config.ORIGINAL_REPORTS, original_reports_max_rows=config.ORIGINAL_REPORTS_MAX_ROWS)
+    generate_excel_report(output_file=output_file, writer=config.REPORT_WRITER, **options, **report)
+    for fmt in config.TABLE_EXPORT_FORMATS:
+        output_dir = config.TABLE_EXPORT_DIR or os.path.splitext(output_file)[0] + '_tables'
+        export_report_tables(os.path.join(output_dir, fmt), fmt, **options, **report)
+
+def plan_loss_harvesting(realized: Union[SliceLedger, np.ndarray], acq_status_df: pd.DataFrame, quotes: QuoteIndex, ttbr_rates: TTBRRateIndex, other_income: float, warnings: List) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """Plans which open lots to sell to offset the realized gains (the slice ledger or its totals) and logs the tax saving."""
+    lots = value_open_lots(acq_status_df, quotes, ttbr_rates, warnings)
+    harvest_plan_df, harvest_outcome = optimize_loss_harvesting(realized, lots, other_income, respect_fifo=config.HARVEST_RESPECT_FIFO)
+    if not harvest_plan_df.empty:
+        logger.info(
+            f"Harvesting plan: selling {harvest_outcome['Shares To Sell']:.4f} shares would cut the tax from "
+            f"{harvest_outcome['Tax Before (INR)']:,.2f} to {harvest_outcome['Tax After (INR)']:,.2f} INR.",
+            extra={'harvest_outcome': harvest_outcome}
         )
-        
-        # Step 2: Perform calculations
-        summary_df, acq_status_df, used_rates, warnings = perform_fifo_matching(sales_df, acq_df, ttbr_rates)
-        used_rates_df = pd.DataFrame(list(used_rates.items()), columns=['Date', 'TTBR']).sort_values('Date')
-        warnings_df = pd.DataFrame(warnings).drop_duplicates().reset_index(drop=True)
-        tax_data = calculate_tax_liability(summary_df, config.INCOME_FROM_OTHER_SOURCES_INR)
-        advance_tax_schedule = calculate_advance_tax_schedule(summary_df, config.INCOME_FROM_OTHER_SOURCES_INR)
-        loss_harvesting_df = generate_loss_harvesting_report(acq_status_df, latest_price, ttbr_rates, warnings)
-
-        # Step 3: Run all validations
-        validation_results = perform_validations(sales_df, acq_df, summary_df, acq_status_df, tax_data)
-        
-        # Step 4: Generate the final Excel report
-        generate_excel_report(
-            output_file=config.OUTPUT_EXCEL_FILE,
-            summary_df=summary_df,
+    return harvest_plan_df, harvest_outcome
+
+def process_portfolio(sales_df: pd.DataFrame, acq_df: pd.DataFrame, quotes: QuoteIndex, ttbr_rates: TTBRRateIndex, other_income: float, output_file: str, profiler: Optional[RunProfiler] = None) -> Dict[str, Any]:
+    """Runs the calculations, validations and Excel report for one taxpayer's cleaned data."""
+    profiler = profiler or RunProfiler()
+    invariants = LedgerInvariants()
+    # Step 2: Perform calculations
+    with profiler.stage('fifo_matching', rows_in=len(sales_df)) as stage:
+        if config.FIFO_STATE_FILE:
+            state_file = os.path.join(os.path.dirname(output_file), config.FIFO_STATE_FILE)
+            slices, acq_status_df, used_rates, warnings, fifo_run = perform_fifo_matching_incremental(sales_df, acq_df, ttbr_rates, state_file, invariants=invariants)
+            if fifo_run['Mode'] == 'Full':
+                logger.info(f"Full FIFO recompute ({fifo_run['Reason']}): matched {fifo_run['New Sales']} sales.", extra={'fifo_run': fifo_run})
+            else:
+                logger.info(f"Incremental FIFO run: matched {fifo_run['New Sales']} new sales and {fifo_run['New Lots']} new vests against the saved lot state.", extra={'fifo_run': fifo_run})
+        else:
+            slices, acq_status_df, used_rates, warnings = perform_fifo_matching(
+                sales_df, acq_df, ttbr_rates, engine=config.FIFO_ENGINE, workers=config.FIFO_BOOK_WORKERS, invariants=invariants
+            )
+        stage.rows_out = len(slices)
+    used_rates_df = pd.DataFrame(list(used_rates.items()), columns=['Date', 'TTBR']).sort_values('Date')
+    warnings_df = pd.DataFrame(warnings)
+    with profiler.stage('tax', rows_in=len(slices)) as stage:
+        tax_data = calculate_tax_liability(slices, other_income)
+        advance_tax_schedule = calculate_advance_tax_schedule(slices, other_income, config.FINANCIAL_YEAR_START)
+        stage.rows_out = len(advance_tax_schedule)
+    with profiler.stage('harvesting', rows_in=len(acq_status_df)) as stage:
+        loss_harvesting_df = generate_loss_harvesting_report(acq_status_df, quotes, ttbr_rates, warnings)
+        harvest_plan_df, harvest_outcome = plan_loss_harvesting(slices, acq_status_df, quotes, ttbr_rates, other_income, warnings)
+        stage.rows_out = len(loss_harvesting_df)
+
+    # Step 3: Run all validations
+    with profiler.stage('validations', rows_in=len(slices)) as stage:
+        validation_results = perform_validations(sales_df, acq_df, slices, acq_status_df, tax_data, invariants)
+        stage.rows_out = len(validation_results)
+    
+    # Step 4: Generate the final Excel report
+    with profiler.stage('report', rows_in=len(slices) + len(acq_status_df)):
+        write_reports(
+            output_file=output_file,
+            slices=slices,
             acq_status_df=acq_status_df,
             tax_data=tax_data,
             schedule_df=advance_tax_schedule,
             used_rates_df=used_rates_df,
             warnings_df=warnings_df,
             loss_harvesting_df=loss_harvesting_df,
+            harvest_plan_df=harvest_plan_df,
+            harvest_outcome=harvest_outcome,
             sales_df=sales_df,
             acq_df=acq_df,
             validation_results=validation_results
         )
+    return {"tax_data": tax_data, "validation_results": validation_results}
+
+def process_portfolio_streaming(sales_file: str, acq_df: pd.DataFrame, quotes: QuoteIndex, ttbr_rates: TTBRRateIndex, other_income: float, output_file: str, chunksize: int, profiler: Optional[RunProfiler] = None) -> Dict[str, Any]:
+    """Streaming form of `process_portfolio`: memory is bounded by the lot count, not the number of sales.
+
+    Matched slices are written to a CSV next to the Excel report instead of its 'Profit Loss Summary' sheet.
+    Reading the sales report is part of the 'fifo_matching' stage here, since it is consumed chunk by chunk.
+    """
+    profiler = profiler or RunProfiler()
+    # Step 2: Match sales chunk by chunk, accumulating the tax totals as slices are produced
+    q_ends, due_dates = get_advance_tax_dates(config.FINANCIAL_YEAR_START)
+    sink = CsvSliceSink(os.path.splitext(output_file)[0] + '_slices.csv')
+    accumulator = StreamingTaxAccumulator(q_ends)
+    invariants = LedgerInvariants()
+    with profiler.stage('fifo_matching') as stage:
+        acq_status_df, used_rates, warnings, stats = stream_fifo_matching(
+            iter_sales_chunks(sales_file, chunksize, engine=config.CSV_ENGINE), acq_df, ttbr_rates, sink, accumulator, invariants=invariants
+        )
+        stage.rows_in, stage.rows_out = stats['Sales Rows'], stats['Slices']
+    logger.info(f"Matched {stats['Slices']} slices from {stats['Sales Rows']} sales into '{sink.path}'.", extra={'slices_file': sink.path})
+    used_rates_df = pd.DataFrame(list(used_rates.items()), columns=['Date', 'TTBR']).sort_values('Date')
+    warnings_df = pd.DataFrame(warnings)
+    with profiler.stage('tax', rows_in=stats['Slices']) as stage:
+        tax_data = accumulator.tax_data(other_income)
+        advance_tax_schedule = accumulator.advance_tax_schedule(other_income, due_dates)
+        stage.rows_out = len(advance_tax_schedule)
+    with profiler.stage('harvesting', rows_in=len(acq_status_df)) as stage:
+        loss_harvesting_df = generate_loss_harvesting_report(acq_status_df, quotes, ttbr_rates, warnings)
+        harvest_plan_df, harvest_outcome = plan_loss_harvesting(accumulator.totals, acq_status_df, quotes, ttbr_rates, other_income, warnings)
+        stage.rows_out = len(loss_harvesting_df)
+
+    # Step 3: Run all validations
+    with profiler.stage('validations', rows_in=stats['Slices']) as stage:
+        validation_results = validate_totals(sales_rows=stats['Sales Rows'], acq_rows=len(acq_df), invariants=invariants, tax_data=tax_data)
+        stage.rows_out = len(validation_results)
+
+    # Step 4: Generate the final Excel report
+    with profiler.stage('report', rows_in=len(acq_status_df)):
+        write_reports(
+            output_file=output_file,
+            slices=None,
+            acq_status_df=acq_status_df,
+            tax_data=tax_data,
+            schedule_df=advance_tax_schedule,
+            used_rates_df=used_rates_df,
+            warnings_df=warnings_df,
+            loss_harvesting_df=loss_harvesting_df,
+            harvest_plan_df=harvest_plan_df,
+            harvest_outcome=harvest_outcome,
+            sales_df=None,
+            acq_df=acq_df,
+            validation_results=validation_results
+        )
+    return {"tax_data": tax_data, "validation_results": validation_results}
+
+def main():
+    """Main function to run the entire capital gains and tax calculation process."""
+    configure_logging(config.LOG_LEVEL, config.LOG_FORMAT)
+    output_dir = os.path.dirname(config.OUTPUT_EXCEL_FILE) or '.'
+    profiler = RunProfiler(config.PROFILE_RUN, track_memory=config.PROFILE_MEMORY, profile_stage=config.PROFILE_STAGE, profile_dir=output_dir)
+    try:
+        # Step 1: Load all data
+        if config.STREAMING_CHUNK_SIZE:
+            with profiler.stage('load') as stage:
+                acq_df, quotes = load_acquisitions_and_price(config.RELEASES_FILE, config.QUOTE_HISTORY_FILE, engine=config.CSV_ENGINE, timings=stage.substages)
+                stage.rows_out = len(acq_df)
+            with profiler.stage('ttbr_rates', rows_in=len(acq_df)) as stage:
+                ttbr_rates = load_ttbr_rates(
+                    config.TTBR_RATES_URL, config.TTBR_CACHE_FILE,
+                    required_dates=[*acq_df['Vest_Date'], datetime.now()],
+                    refresh=config.TTBR_FORCE_REFRESH, offline=config.TTBR_OFFLINE
+                )
+                stage.rows_out = len(ttbr_rates)
+            process_portfolio_streaming(
+                config.CAPITAL_GAINS_FILE, acq_df, quotes, ttbr_rates,
+                config.INCOME_FROM_OTHER_SOURCES_INR, config.OUTPUT_EXCEL_FILE, config.STREAMING_CHUNK_SIZE, profiler
+            )
+            return
+
+        with profiler.stage('load') as stage:
+            sales_df, acq_df, quotes = load_and_clean_data(
+                config.CAPITAL_GAINS_FILE, config.RELEASES_FILE, config.QUOTE_HISTORY_FILE, engine=config.CSV_ENGINE, timings=stage.substages
+            )
+            stage.rows_out = len(sales_df) + len(acq_df)
+        with profiler.stage('ttbr_rates', rows_in=len(sales_df) + len(acq_df)) as stage:
+            ttbr_rates = load_ttbr_rates(
+                config.TTBR_RATES_URL, config.TTBR_CACHE_FILE,
+                required_dates=[*sales_df['Sale_Date'], *acq_df['Vest_Date'], datetime.now()],
+                refresh=config.TTBR_FORCE_REFRESH, offline=config.TTBR_OFFLINE
+            )
+            stage.rows_out = len(ttbr_rates)
+        
+        process_portfolio(sales_df, acq_df, quotes, ttbr_rates, config.INCOME_FROM_OTHER_SOURCES_INR, config.OUTPUT_EXCEL_FILE, profiler)
     except Exception as e:
-        print(f"\n❌ An unexpected error occurred: {e}")
-        print("Please check your input files and the script configuration.")
+        logger.error(
+            f"An unexpected error occurred during the '{profiler.current_stage or 'setup'}' stage: {e}\n"
+            "Please check your input files and the script configuration.",
+            exc_info=True, extra={'failed_stage': profiler.current_stage}
+        )
+    finally:
+        if config.PROFILE_RUN:
+            profiler.write(os.path.join(output_dir, config.RUN_PROFILE_FILE))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,7 +1,27 @@
+import logging
 import pandas as pd
+import config
+from reporting.writers import REPORT_WRITERS, TableDirectoryReportWriter
 
-def generate_excel_report(output_file, **kwargs):
-    """Writes all the calculated dataframes to a formatted, multi-sheet Excel file."""
+logger = logging.getLogger(__name__)
+
+ORIGINAL_REPORT_MODES = ('full', 'sample', 'skip')
+
+def _original_report(df, mode, max_rows):
+    """Returns the original report as written to the workbook: whole, evenly sampled to `max_rows`, or None."""
+    if df is None or mode == 'skip':
+        return None
+    if mode == 'sample' and len(df) > max_rows:
+        return df.iloc[[round(i * (len(df) - 1) / max(max_rows - 1, 1)) for i in range(max_rows)]]
+    return df
+
+def _write_report(writer, original_reports='full', original_reports_max_rows=1000, book_columns=None, **kwargs):
+    """Issues every table of the report, in sheet order, to a writer from `reporting.writers`.
+
+    `book_columns` (default `config.LOT_BOOK_COLUMNS`) are the lot book columns that lead the lot status table.
+    """
+    if original_reports not in ORIGINAL_REPORT_MODES:
+        raise ValueError(f"Unknown original_reports mode '{original_reports}'. Choose one of: {', '.join(ORIGINAL_REPORT_MODES)}")
     tax_explanation = [
         ("How Your Tax Is Calculated: A Step-by-Step Guide", ""),
         ("Step 1: Convert all USD Transactions to INR", "This is the most critical step. All USD amounts are converted to INR using the official method prescribed by Indian Tax Law."),
@@ -31,31 +51,61 @@ def generate_excel_report(output_file, **kwargs):
         ("Tax Integrity Check:", f"{kwargs['validation_results']['Tax Integrity']}"),
     ]
 
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        kwargs['summary_df'].to_excel(writer, sheet_name='Profit Loss Summary', index=False)
-        pd.DataFrame(tax_explanation).to_excel(writer, sheet_name='Tax Calculation Explained', index=False, header=False)
-        if not kwargs['warnings_df'].empty:
-            kwargs['warnings_df'].to_excel(writer, sheet_name='TTBR Warnings', index=False)
-        if not kwargs['loss_harvesting_df'].empty:
-            kwargs['loss_harvesting_df'].to_excel(writer, sheet_name='Tax Loss Harvesting', index=False)
-        
-        # Build Main Tax Sheet
+    if kwargs['summary_df'] is not None:
+        writer.write(kwargs['summary_df'], 'Profit Loss Summary')
+    writer.write(pd.DataFrame(tax_explanation), 'Tax Calculation Explained', header=False)
+    if not kwargs['warnings_df'].empty:
+        writer.write(kwargs['warnings_df'], 'TTBR Warnings')
+    if not kwargs['loss_harvesting_df'].empty:
+        writer.write(kwargs['loss_harvesting_df'], 'Tax Loss Harvesting')
+    if kwargs.get('harvest_plan_df') is not None and not kwargs['harvest_plan_df'].empty:
         current_row = 0
-        set_off_summary = pd.DataFrame({'Category': ['Short-Term', 'Long-Term'],'Gross Gains (INR)': [kwargs['tax_data']['stcg'], kwargs['tax_data']['ltcg']],'Gross Losses (INR)': [kwargs['tax_data']['stcl'], kwargs['tax_data']['ltcl']],'Net Taxable Gains (INR)': [kwargs['tax_data']['net_taxable_stcg'], kwargs['tax_data']['net_taxable_ltcg']]})
-        tax_summary = pd.DataFrame({'Description': ['Total Base Tax', 'Total Surcharge', 'Total Health & Education Cess', 'TOTAL TAX LIABILITY'],'Amount (INR)': [kwargs['tax_data']['total_base_tax'], kwargs['tax_data']['total_surcharge'], kwargs['tax_data']['total_cess'], kwargs['tax_data']['total_tax_liability']]})
-        pd.DataFrame([['TAX SET-OFF CALCULATION']]).to_excel(writer, sheet_name='Tax Calculation', index=False, header=False, startrow=current_row); current_row += 1
-        set_off_summary.to_excel(writer, sheet_name='Tax Calculation', index=False, startrow=current_row); current_row += len(set_off_summary) + 2
-        pd.DataFrame([['FINAL TAX LIABILITY']]).to_excel(writer, sheet_name='Tax Calculation', index=False, header=False, startrow=current_row); current_row += 1
-        tax_summary.to_excel(writer, sheet_name='Tax Calculation', index=False, startrow=current_row); current_row += len(tax_summary) + 2
-        pd.DataFrame([['ADVANCE TAX PAYMENT SCHEDULE']]).to_excel(writer, sheet_name='Tax Calculation', index=False, header=False, startrow=current_row); current_row += 1
-        kwargs['schedule_df'].to_excel(writer, sheet_name='Tax Calculation', index=False, startrow=current_row); current_row += len(kwargs['schedule_df']) + 2
-        pd.DataFrame(notes_list).to_excel(writer, sheet_name='Tax Calculation', index=False, header=False, startrow=current_row)
-
-        kwargs['used_rates_df'].to_excel(writer, sheet_name='TTBR Rates Used', index=False)
-        kwargs['sales_df'].to_excel(writer, sheet_name='Original Sales Report', index=False)
-        kwargs['acq_df'].to_excel(writer, sheet_name='Original Releases Report', index=False)
-        
-        acq_status_df = kwargs['acq_status_df'][['Acquisition_Date', 'Shares_Acquired', 'Shares_Sold_from_Lot', 'Remaining_Shares']]
-        acq_status_df.to_excel(writer, sheet_name='Acquisition Lot Status', index=False)
-
-    print(f"\n✅ Success! The '{output_file}' has been created with all validations and supercharged features.")
\ No newline at end of file
+        if kwargs.get('harvest_outcome'):
+            outcome = pd.DataFrame({'Description': list(kwargs['harvest_outcome']), 'Value': list(kwargs['harvest_outcome'].values())})
+            writer.write_title('Harvesting Plan', 'TAX BEFORE AND AFTER THE PLAN', current_row); current_row += 1
+            writer.write(outcome, 'Harvesting Plan', startrow=current_row, table_name='Harvesting Outcome'); current_row += len(outcome) + 2
+            writer.write_title('Harvesting Plan', 'LOTS TO SELL', current_row); current_row += 1
+        writer.write(kwargs['harvest_plan_df'], 'Harvesting Plan', startrow=current_row)
+    
+    # Build Main Tax Sheet
+    current_row = 0
+    set_off_summary = pd.DataFrame({'Category': ['Short-Term', 'Long-Term'],'Gross Gains (INR)': [kwargs['tax_data']['stcg'], kwargs['tax_data']['ltcg']],'Gross Losses (INR)': [kwargs['tax_data']['stcl'], kwargs['tax_data']['ltcl']],'Net Taxable Gains (INR)': [kwargs['tax_data']['net_taxable_stcg'], kwargs['tax_data']['net_taxable_ltcg']]})
+    tax_summary = pd.DataFrame({'Description': ['Total Base Tax', 'Total Surcharge', 'Total Health & Education Cess', 'TOTAL TAX LIABILITY'],'Amount (INR)': [kwargs['tax_data']['total_base_tax'], kwargs['tax_data']['total_surcharge'], kwargs['tax_data']['total_cess'], kwargs['tax_data']['total_tax_liability']]})
+    writer.write_title('Tax Calculation', 'TAX SET-OFF CALCULATION', current_row); current_row += 1
+    writer.write(set_off_summary, 'Tax Calculation', startrow=current_row, table_name='Tax Set-Off'); current_row += len(set_off_summary) + 2
+    writer.write_title('Tax Calculation', 'FINAL TAX LIABILITY', current_row); current_row += 1
+    writer.write(tax_summary, 'Tax Calculation', startrow=current_row, table_name='Final Tax Liability'); current_row += len(tax_summary) + 2
+    writer.write_title('Tax Calculation', 'ADVANCE TAX PAYMENT SCHEDULE', current_row); current_row += 1
+    writer.write(kwargs['schedule_df'], 'Tax Calculation', startrow=current_row, table_name='Advance Tax Schedule'); current_row += len(kwargs['schedule_df']) + 2
+    writer.write(pd.DataFrame(notes_list), 'Tax Calculation', startrow=current_row, header=False, table_name='Tax Calculation Notes')
+
+    writer.write(kwargs['used_rates_df'], 'TTBR Rates Used')
+    sales_df = _original_report(kwargs['sales_df'], original_reports, original_reports_max_rows)
+    if sales_df is not None:
+        writer.write(sales_df, 'Original Sales Report')
+    acq_df = _original_report(kwargs['acq_df'], original_reports, original_reports_max_rows)
+    if acq_df is not None:
+        writer.write(acq_df, 'Original Releases Report')
+    
+    book_columns = list(config.LOT_BOOK_COLUMNS if book_columns is None else book_columns)
+    acq_status_df = kwargs['acq_status_df'][book_columns + ['Acquisition_Date', 'Shares_Acquired', 'Shares_Sold_from_Lot', 'Remaining_Shares']]
+    writer.write(acq_status_df, 'Acquisition Lot Status')
+
+def generate_excel_report(output_file, writer='openpyxl', **kwargs):
+    """Writes all the calculated dataframes to a formatted, multi-sheet Excel file.
+
+    `summary_df` and `sales_df` may be None when the slices were streamed to a separate file.
+    `writer` picks the backend: 'openpyxl' (default) or the constant-memory 'xlsxwriter'.
+    `original_reports` ('full', 'sample' or 'skip') controls how much of the input reports is copied in.
+    """
+    if writer not in REPORT_WRITERS:
+        raise ValueError(f"Unknown report writer '{writer}'. Choose one of: {', '.join(REPORT_WRITERS)}")
+    with REPORT_WRITERS[writer](output_file) as report_writer:
+        _write_report(report_writer, **kwargs)
+
+    logger.info(f"Success! The '{output_file}' has been created with all validations and supercharged features.", extra={'output_file': output_file})
+
+def export_report_tables(output_dir, fmt='csv', **kwargs):
+    """Writes every table of the Excel report to `output_dir` as one CSV, JSON or Parquet file each."""
+    _write_report(TableDirectoryReportWriter(output_dir, fmt), **kwargs)
+    logger.info(f"Report tables exported as {fmt} to '{output_dir}'.", extra={'output_dir': output_dir, 'format': fmt})
\ No newline at end of file
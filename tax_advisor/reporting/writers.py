@@ -0,0 +1,97 @@
+import os
+import re
+import pandas as pd
+from typing import Optional
+
+class ExcelReportWriter:
+    """Writes report tables to an .xlsx workbook through pandas and openpyxl."""
+
+    def __init__(self, output_file: str):
+        self._writer = pd.ExcelWriter(output_file, engine='openpyxl')
+
+    def write(self, df: pd.DataFrame, sheet_name: str, startrow: int = 0, header: bool = True, table_name: Optional[str] = None):
+        df.to_excel(self._writer, sheet_name=sheet_name, index=False, header=header, startrow=startrow)
+
+    def write_title(self, sheet_name: str, title: str, row: int):
+        self.write(pd.DataFrame([[title]]), sheet_name, startrow=row, header=False)
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class StreamingXlsxReportWriter(ExcelReportWriter):
+    """Constant-memory .xlsx writer built on xlsxwriter; each row is flushed to disk once written.
+
+    Rows within a sheet must be written top to bottom, which is how the report is laid out. Tables are
+    converted to cell values `ROW_BLOCK` rows at a time, so no full copy of a large table is made.
+    Cells match the openpyxl writer's: plain headers, dates as `DATE_FORMAT` and datetime columns as `DATETIME_FORMAT`.
+    """
+
+    ROW_BLOCK = 10000
+    DATE_FORMAT, DATETIME_FORMAT = 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM:SS'  # pandas' defaults for the openpyxl writer.
+
+    def __init__(self, output_file: str):
+        try:
+            import xlsxwriter
+        except ImportError as e:
+            raise ImportError("The 'xlsxwriter' report writer needs the xlsxwriter package: pip install xlsxwriter") from e
+        self._workbook = xlsxwriter.Workbook(output_file, {'constant_memory': True, 'default_date_format': self.DATE_FORMAT})
+        self._datetime_format = self._workbook.add_format({'num_format': self.DATETIME_FORMAT})
+        self._sheets = {}
+
+    def write(self, df: pd.DataFrame, sheet_name: str, startrow: int = 0, header: bool = True, table_name: Optional[str] = None):
+        if sheet_name not in self._sheets:
+            self._sheets[sheet_name] = self._workbook.add_worksheet(sheet_name)
+        worksheet = self._sheets[sheet_name]
+        if header:
+            worksheet.write_row(startrow, 0, [str(col) for col in df.columns])
+            startrow += 1
+        column_formats = [self._datetime_format if pd.api.types.is_datetime64_any_dtype(dtype) else None for dtype in df.dtypes]
+        for block_start in range(0, len(df), self.ROW_BLOCK):
+            block = df.iloc[block_start:block_start + self.ROW_BLOCK]
+            # Missing values become empty cells, as with the openpyxl writer.
+            cells = block.astype(object).where(block.notna(), None)
+            for offset, values in enumerate(cells.itertuples(index=False, name=None), start=startrow + block_start):
+                for col, (value, cell_format) in enumerate(zip(values, column_formats)):
+                    worksheet.write(offset, col, value, cell_format if value is not None else None)
+
+    def close(self):
+        self._workbook.close()
+
+class TableDirectoryReportWriter(ExcelReportWriter):
+    """Writes each report table to its own CSV, JSON or Parquet file for downstream systems.
+
+    Section titles are dropped; every other table is named after its `table_name`, or its sheet.
+    """
+
+    FORMATS = ('csv', 'json', 'parquet')
+
+    def __init__(self, output_dir: str, fmt: str):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown table format '{fmt}'. Choose one of: {', '.join(self.FORMATS)}")
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir, self.fmt = output_dir, fmt
+
+    def write(self, df: pd.DataFrame, sheet_name: str, startrow: int = 0, header: bool = True, table_name: Optional[str] = None):
+        name = re.sub(r'[^a-z0-9]+', '_', (table_name or sheet_name).lower()).strip('_')
+        path = os.path.join(self.output_dir, f"{name}.{self.fmt}")
+        df = df.rename(columns=str)
+        if self.fmt == 'csv':
+            df.to_csv(path, index=False, header=header)
+        elif self.fmt == 'json':
+            df.to_json(path, orient='records', date_format='iso', indent=2)
+        else:
+            df.to_parquet(path, index=False)
+
+    def write_title(self, sheet_name: str, title: str, row: int):
+        pass
+
+    def close(self):
+        pass
+
+REPORT_WRITERS = {'openpyxl': ExcelReportWriter, 'xlsxwriter': StreamingXlsxReportWriter}
\ No newline at end of file
@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+# The pipeline modules are imported top-level (`import config`, `from core_logic...`), as when run from this folder.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_inputs
+from data_loader.loader import load_and_clean_data, load_ttbr_rates
+
+SYNTHETIC_SALES_ROWS = 2000
+
+@pytest.fixture(scope='session')
+def synthetic_paths(tmp_path_factory):
+    """Synthetic brokerage reports and TTBR CSV; their sales share dates, so FIFO order among ties matters."""
+    return generate_inputs(str(tmp_path_factory.mktemp('synthetic')), SYNTHETIC_SALES_ROWS, seed=0)
+
+@pytest.fixture(scope='session')
+def synthetic_data(synthetic_paths, tmp_path_factory):
+    """(sales_df, acq_df, quotes, ttbr_rates) loaded from `synthetic_paths` as the pipeline loads them."""
+    sales_df, acq_df, quotes = load_and_clean_data(synthetic_paths['sales'], synthetic_paths['releases'], synthetic_paths['quotes'], engine='c')
+    cache_file = str(tmp_path_factory.mktemp('ttbr') / 'ttbr_rates_cache.npy')
+    return sales_df, acq_df, quotes, load_ttbr_rates(synthetic_paths['ttbr'], cache_file, refresh=True)
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+import config
+from core_logic.fifo_calculator import compare_fifo_engines, perform_fifo_matching
+
+def _sales(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['Sale_Date', 'Sale_Price', 'Shares_Sold', 'Symbol']).astype({'Sale_Date': 'datetime64[us]'})
+
+def _lots(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['Vest_Date', 'Plan', 'Acquisition_Price', 'Shares_Acquired']).astype({'Vest_Date': 'datetime64[us]'})
+
+def _assert_engines_agree(sales_df, acq_df, ttbr_rates):
+    assert compare_fifo_engines(sales_df, acq_df, ttbr_rates) == dict.fromkeys(
+        ['Profit Loss Summary', 'Acquisition Lot Status', 'TTBR Rates Used', 'TTBR Warnings'], 'Pass')
+
+def test_engines_agree_on_synthetic_reports(synthetic_data):
+    sales_df, acq_df, _, ttbr_rates = synthetic_data
+    _assert_engines_agree(sales_df, acq_df, ttbr_rates)
+
+def test_engines_agree_on_sales_before_the_first_vest_and_partly_sold_lots(synthetic_data):
+    ttbr_rates = synthetic_data[3]
+    sales_df = _sales([
+        ('2019-02-11', 110.0, 3.0, 'GOOG'),     # Before any lot has vested.
+        ('2019-06-03', 120.0, 2.5, 'GOOG'),     # Part of the first lot.
+        ('2019-06-03', 121.0, 4.0, 'GOOG'),     # The rest of it and part of the second, on a tied date.
+        ('2020-09-14', 150.0, 100.0, 'GOOG'),   # More than is left.
+    ])
+    acq_df = _lots([('2019-05-02', 'GSU Class C', 100.0, 5.0), ('2019-05-20', 'GSU Class C', 105.0, 8.0)])
+    _assert_engines_agree(sales_df, acq_df, ttbr_rates)
+
+    _, acq_status_df, _, _ = perform_fifo_matching(sales_df.iloc[:3], acq_df, ttbr_rates, engine='loop')
+    assert list(acq_status_df['Remaining_Shares']) == pytest.approx([0.0, 6.5])
+
+def test_engines_agree_across_books(synthetic_data, monkeypatch):
+    ttbr_rates = synthetic_data[3]
+    monkeypatch.setattr(config, 'PLAN_SYMBOLS', {'GSU Class C': 'GOOG', 'GSU Class A': 'GOOGL'})
+    sales_df = _sales([
+        ('2019-06-03', 120.0, 4.0, 'GOOGL'),
+        ('2019-06-03', 121.0, 6.0, 'GOOG'),      # One share short: the August lot vests later.
+        ('2020-01-15', 130.0, 1.5, 'GOOGL'),
+        ('2020-03-02', 90.0, 5.0, 'GOOG'),
+    ])
+    acq_df = _lots([
+        ('2019-05-02', 'GSU Class C', 100.0, 5.0), ('2019-05-02', 'GSU Class A', 101.0, 3.0),
+        ('2019-05-20', 'GSU Class A', 105.0, 8.0), ('2019-08-01', 'GSU Class C', 95.0, 10.0),
+    ])
+    _assert_engines_agree(sales_df, acq_df, ttbr_rates)
+
+    slices, acq_status_df, _, _ = perform_fifo_matching(sales_df, acq_df, ttbr_rates, engine='loop')
+    assert list(acq_status_df['Symbol']) == ['GOOG', 'GOOGL', 'GOOGL', 'GOOG']
+    assert list(acq_status_df['Remaining_Shares']) == pytest.approx([0.0, 0.0, 5.5, 5.0])
+    assert set(slices.book_values['Symbol']) == {'GOOG', 'GOOGL'}
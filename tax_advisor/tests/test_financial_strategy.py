@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core_logic.financial_strategy import optimize_loss_harvesting, select_harvest_lots
+
+def _lots(gain_per_share, shares, gain_types) -> pd.DataFrame:
+    """Lots valued as by `value_open_lots`, in acquisition order, with the given gain per share."""
+    count = len(shares)
+    return pd.DataFrame({
+        'Symbol': 'GOOG', 'Acquisition_Date': pd.date_range('2022-01-03', periods=count, freq='MS'),
+        'Remaining_Shares': np.asarray(shares, dtype=float), 'Current_Market_Price_USD': 100.0,
+        'Gain_Type': gain_types, 'Value_Per_Share_INR': 1000.0 + np.asarray(gain_per_share, dtype=float), 'Cost_Per_Share_INR': 1000.0,
+    })
+
+def test_partial_stcg_target_leaves_short_term_losses_off_the_ltcg_need():
+    # STCG 100,000 and LTCG 50,000; only 40,000 of the STCG is to be offset.
+    totals = np.array([100000.0, 0.0, 50000.0, 0.0])
+    lots = _lots([-100.0, -50.0], [1000, 1000], ['STCG', 'LTCG'])
+    plan, outcome = optimize_loss_harvesting(totals, lots, 0.0, target_stcg=40000.0, book_columns=['Symbol'])
+
+    assert outcome['STCG Offset (INR)'] == pytest.approx(40000.0)
+    assert outcome['LTCG Offset (INR)'] == pytest.approx(50000.0)
+    assert dict(zip(plan['Gain_Type'], plan['Shares_To_Sell'])) == pytest.approx({'STCG': 400.0, 'LTCG': 1000.0})
+
+def test_short_term_losses_reach_ltcg_only_after_the_stcg_left():
+    loss_per_share, shares, is_long = np.array([100.0, 50.0]), np.array([1000.0, 200.0]), np.array([False, True])
+    for_stcg, for_ltcg = select_harvest_lots(loss_per_share, shares, is_long, 40000.0, 50000.0, stcg_left=30000.0)
+    np.testing.assert_allclose(for_stcg, [400.0, 0.0])
+    # 10,000 of LTCL from the long-term lot; the 40,000 still needed must first clear the 30,000 of STCG left.
+    np.testing.assert_allclose(for_ltcg, [600.0, 200.0])
+
+def test_respect_fifo_sells_each_book_oldest_lots_first():
+    totals = np.array([100000.0, 0.0, 0.0, 0.0])
+    lots = _lots([10.0, -100.0, -200.0], [100, 1000, 1000], ['STCG', 'STCG', 'STCG'])
+
+    plan, outcome = optimize_loss_harvesting(totals, lots, 0.0, respect_fifo=True, book_columns=['Symbol'])
+    # The gain lot comes first in FIFO order, so its 1,000 of gain has to be offset too.
+    np.testing.assert_allclose(plan['Shares_To_Sell'], [100.0, 1000.0, 5.0])
+    assert list(plan['Acquisition_Date']) == list(lots['Acquisition_Date'])
+    assert outcome['STCG Offset (INR)'] == pytest.approx(100000.0)
+    assert outcome['Tax After (INR)'] == pytest.approx(0.0)
+
+    free_plan, free_outcome = optimize_loss_harvesting(totals, lots, 0.0, book_columns=['Symbol'])
+    np.testing.assert_allclose(free_plan['Shares_To_Sell'], [500.0])
+    assert free_outcome['Tax After (INR)'] == pytest.approx(0.0)
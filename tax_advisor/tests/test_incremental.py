@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+from core_logic.fifo_calculator import perform_fifo_matching
+from core_logic.incremental import perform_fifo_matching_incremental
+from data_loader.loader import load_and_clean_data
+
+def _truncate_report(path: str, output_path: str, title_rows: int, rows: int) -> str:
+    """Copy of a brokerage report with only its first `rows` table rows, keeping the title lines and footer."""
+    with open(path) as f:
+        lines = f.readlines()
+    with open(output_path, 'w') as f:
+        f.writelines(lines[:title_rows + 1 + rows] + lines[-1:])
+    return output_path
+
+def _assert_same_result(result, expected):
+    slices, acq_status_df, used_rates, warnings = result[:4]
+    pd.testing.assert_frame_equal(slices.to_frame(), expected[0].to_frame())
+    pd.testing.assert_frame_equal(acq_status_df, expected[1])
+    assert used_rates == expected[2]
+    assert sorted(warnings, key=lambda warning: warning['Required Date']) == sorted(expected[3], key=lambda warning: warning['Required Date'])
+
+@pytest.fixture
+def earlier_data(synthetic_paths, synthetic_data, tmp_path):
+    """The sales and vests of the same reports as they stood halfway through: an earlier download of them."""
+    sales_df, acq_df = synthetic_data[0], synthetic_data[1]
+    sales_rows = len(sales_df) // 2
+    vest_rows = int((acq_df['Vest_Date'] <= sales_df['Sale_Date'].iloc[sales_rows - 1]).sum())
+    sales_file = _truncate_report(synthetic_paths['sales'], str(tmp_path / 'sales.csv'), 2, sales_rows)
+    acq_file = _truncate_report(synthetic_paths['releases'], str(tmp_path / 'releases.csv'), 1, vest_rows)
+    return load_and_clean_data(sales_file, acq_file, synthetic_paths['quotes'], engine='c')[:2]
+
+def test_appended_reports_resume_from_saved_state(synthetic_data, earlier_data, tmp_path):
+    sales_df, acq_df, _, ttbr_rates = synthetic_data
+    state_file = str(tmp_path / 'fifo_state.npz')
+
+    first = perform_fifo_matching_incremental(*earlier_data, ttbr_rates, state_file)
+    assert first[4]['Mode'] == 'Full' and first[4]['Reason'] == 'no saved FIFO state'
+    _assert_same_result(first, perform_fifo_matching(*earlier_data, ttbr_rates))
+
+    result = perform_fifo_matching_incremental(sales_df, acq_df, ttbr_rates, state_file)
+    assert result[4] == {'Mode': 'Incremental', 'Reason': '', 'New Sales': len(sales_df) - len(earlier_data[0]), 'New Lots': len(acq_df) - len(earlier_data[1])}
+    _assert_same_result(result, perform_fifo_matching(sales_df, acq_df, ttbr_rates))
+
+    rerun = perform_fifo_matching_incremental(sales_df, acq_df, ttbr_rates, state_file)
+    assert rerun[4]['Mode'] == 'Incremental' and rerun[4]['New Sales'] == 0
+    _assert_same_result(rerun, result)
+
+def test_appended_vests_resume_from_saved_state(synthetic_data, earlier_data, tmp_path):
+    _, acq_df, _, ttbr_rates = synthetic_data
+    earlier_sales = earlier_data[0]
+    state_file = str(tmp_path / 'fifo_state.npz')
+    perform_fifo_matching_incremental(*earlier_data, ttbr_rates, state_file)
+
+    result = perform_fifo_matching_incremental(earlier_sales, acq_df, ttbr_rates, state_file)
+    assert result[4]['Mode'] == 'Incremental' and result[4]['New Sales'] == 0
+    _assert_same_result(result, perform_fifo_matching(earlier_sales, acq_df, ttbr_rates))
+
+def test_edited_old_sale_forces_full_recompute(synthetic_data, tmp_path):
+    sales_df, acq_df, _, ttbr_rates = synthetic_data
+    state_file = str(tmp_path / 'fifo_state.npz')
+    perform_fifo_matching_incremental(sales_df, acq_df, ttbr_rates, state_file)
+
+    edited = sales_df.copy()
+    edited.loc[3, 'Shares_Sold'] -= 0.5
+    result = perform_fifo_matching_incremental(edited, acq_df, ttbr_rates, state_file)
+    assert result[4]['Mode'] == 'Full' and result[4]['Reason'] == 'previously processed sales were edited or removed'
+    _assert_same_result(result, perform_fifo_matching(edited, acq_df, ttbr_rates))
+
+def test_new_vests_before_unmatched_sales_force_full_recompute(earlier_data, synthetic_data, tmp_path):
+    ttbr_rates = synthetic_data[3]
+    earlier_sales, earlier_acq = earlier_data
+    state_file = str(tmp_path / 'fifo_state.npz')
+    short = perform_fifo_matching_incremental(earlier_sales, earlier_acq.iloc[:5], ttbr_rates, state_file)
+    assert short[0].micro_shares.sum() < (earlier_sales['Shares_Sold'] * 1_000_000).round().sum()
+
+    result = perform_fifo_matching_incremental(earlier_sales, earlier_acq, ttbr_rates, state_file)
+    assert result[4]['Mode'] == 'Full' and result[4]['Reason'] == 'new vests predate sales that were left unmatched'
+    _assert_same_result(result, perform_fifo_matching(earlier_sales, earlier_acq, ttbr_rates))
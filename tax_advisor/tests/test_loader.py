@@ -0,0 +1,17 @@
+import pandas as pd
+import config
+from data_loader.loader import _build_quote_index
+
+def _quote_report() -> pd.DataFrame:
+    return pd.DataFrame({
+        'Fund': ['GOOG Class C', 'GOOGL Fund', 'Other Fund'],
+        'Date': ['01-Jan-2024', '02-Jan-2024', '03-Jan-2024'],
+        'Price': ['$100.00', '$101.00', '$5.00'],
+    })
+
+def test_quote_rows_match_the_ticker_as_a_substring_by_default():
+    assert _build_quote_index(_quote_report(), 'c', '%d-%b-%Y').latest(['GOOG'])[0] == 101.0
+
+def test_quote_fund_pattern_replaces_substring_matching(monkeypatch):
+    monkeypatch.setattr(config, 'QUOTE_FUND_PATTERNS', {'GOOG': r'\bGOOG\b'})
+    assert _build_quote_index(_quote_report(), 'c', '%d-%b-%Y').latest(['GOOG'])[0] == 100.0
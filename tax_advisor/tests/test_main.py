@@ -0,0 +1,13 @@
+import os
+from core_logic.fifo_calculator import LotBooks, perform_fifo_matching
+from main import process_portfolio
+
+def test_empty_reports_keep_the_lot_status_columns(synthetic_data, tmp_path):
+    sales_df, acq_df, quotes, ttbr_rates = synthetic_data
+    _, acq_status_df, _, _ = perform_fifo_matching(sales_df.iloc[:0], acq_df.iloc[:0], ttbr_rates)
+    assert list(acq_status_df.columns) == list(LotBooks(acq_df, ['Symbol']).lot_status().columns)
+
+    output_file = str(tmp_path / 'report.xlsx')
+    result = process_portfolio(sales_df.iloc[:0], acq_df.iloc[:0], quotes, ttbr_rates, 5e6, output_file)
+    assert result['tax_data']['total_tax_liability'] == 0
+    assert os.path.exists(output_file)
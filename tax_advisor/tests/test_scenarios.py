@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core_logic.fifo_calculator import perform_fifo_matching
+from core_logic.financial_strategy import value_open_lots
+from core_logic.scenarios import evaluate_scenarios, scenario_grid
+from core_logic.tax_calculator import get_advance_tax_dates
+
+FY_START_YEAR = 2021
+
+@pytest.fixture
+def fy_data(synthetic_data):
+    """Slices sold by the FY's last cut-off, the lots' status and a scenario grid in which selling them is a gain."""
+    sales_df, acq_df, quotes, ttbr_rates = synthetic_data
+    q_ends, _ = get_advance_tax_dates(FY_START_YEAR)
+    slices, acq_status_df, _, _ = perform_fifo_matching(sales_df[sales_df['Sale_Date'] <= q_ends[-1]], acq_df, ttbr_rates)
+    grid = scenario_grid(price_multipliers=[2.0, 3.0], ttbr_shifts=[-2.0, 2.0], other_incomes=[0.0, 2.1e7])
+    return slices, acq_status_df.assign(Remaining_Shares=acq_status_df['Shares_Acquired']), quotes, ttbr_rates, grid
+
+@pytest.mark.parametrize('valuation_date', ['2021-08-02', '2023-08-01'])
+def test_installments_add_up_to_the_liability(fy_data, valuation_date):
+    slices, acq_status_df, quotes, ttbr_rates, grid = fy_data
+    lots = value_open_lots(acq_status_df, quotes, ttbr_rates, [], sale_date=valuation_date)
+    results = evaluate_scenarios(slices, lots, grid, FY_START_YEAR)
+    installments = results.filter(like='Advance Tax Due').to_numpy().sum(axis=1)
+    np.testing.assert_allclose(installments, results['total_tax_liability'])
+
+def test_sale_after_the_fy_is_left_out(fy_data):
+    slices, acq_status_df, quotes, ttbr_rates, grid = fy_data
+    in_fy = evaluate_scenarios(slices, value_open_lots(acq_status_df, quotes, ttbr_rates, [], sale_date='2021-08-02'), grid, FY_START_YEAR)
+    after_fy = evaluate_scenarios(slices, value_open_lots(acq_status_df, quotes, ttbr_rates, [], sale_date='2023-08-01'), grid, FY_START_YEAR)
+    realized_only = evaluate_scenarios(slices, None, grid, FY_START_YEAR)
+    pd.testing.assert_frame_equal(after_fy, realized_only)
+    assert (in_fy['total_tax_liability'] > realized_only['total_tax_liability']).all()
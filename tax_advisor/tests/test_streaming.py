@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from core_logic.fifo_calculator import perform_fifo_matching
+from core_logic.streaming import CsvSliceSink, StreamingTaxAccumulator, stream_fifo_matching
+from core_logic.tax_calculator import calculate_tax_liability, calculate_advance_tax_schedule, get_advance_tax_dates
+from data_loader.loader import iter_sales_chunks
+
+FY_START_YEAR = 2021
+
+def test_streaming_matches_in_memory_with_tied_sale_dates(synthetic_paths, synthetic_data, tmp_path):
+    sales_df, acq_df, _, ttbr_rates = synthetic_data
+    assert sales_df['Sale_Date'].duplicated().sum() > 100
+
+    slices, acq_status_df, used_rates, _ = perform_fifo_matching(sales_df, acq_df, ttbr_rates)
+    q_ends, due_dates = get_advance_tax_dates(FY_START_YEAR)
+    sink, accumulator = CsvSliceSink(str(tmp_path / 'slices.csv')), StreamingTaxAccumulator(q_ends)
+    streamed_status, streamed_rates, _, stats = stream_fifo_matching(iter_sales_chunks(synthetic_paths['sales'], 97), acq_df, ttbr_rates, sink, accumulator)
+
+    assert stats['Slices'] == len(slices)
+    np.testing.assert_array_equal(accumulator.totals_paise, slices.gain_components_paise().sum(axis=1))
+    assert accumulator.tax_data(5e6) == calculate_tax_liability(slices, 5e6)
+    pd.testing.assert_frame_equal(accumulator.advance_tax_schedule(5e6, due_dates), calculate_advance_tax_schedule(slices, 5e6, FY_START_YEAR))
+    streamed = pd.read_csv(sink.path, parse_dates=['Sale_Date'])
+    pd.testing.assert_frame_equal(streamed, slices.to_frame(), check_dtype=False)
+    pd.testing.assert_frame_equal(streamed_status, acq_status_df)
+    assert streamed_rates == used_rates
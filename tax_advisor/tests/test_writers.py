@@ -0,0 +1,33 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from reporting.writers import ExcelReportWriter, StreamingXlsxReportWriter
+
+openpyxl = pytest.importorskip('openpyxl')
+pytest.importorskip('xlsxwriter')
+
+def _write(writer_class, path: str) -> str:
+    table = pd.DataFrame({
+        'Sale_Date': pd.to_datetime(['2024-01-02', '2024-03-04', None]),
+        'Installment Due Date': [date(2024, 6, 15), date(2024, 9, 15), date(2024, 12, 15)],
+        'Amount (INR)': [1.5, np.nan, 3.25],
+        'Symbol': ['GOOG', None, 'MSFT'],
+    })
+    with writer_class(path) as writer:
+        writer.write_title('Tax Calculation', 'ADVANCE TAX PAYMENT SCHEDULE', 0)
+        writer.write(table, 'Tax Calculation', startrow=1)
+        writer.write(table, 'Profit Loss Summary', header=False)
+    return path
+
+def _cells(path: str):
+    workbook = openpyxl.load_workbook(path)
+    return {
+        name: [[(cell.value, cell.number_format, bool(cell.font.b), cell.border.left.style, cell.alignment.horizontal) for cell in row]
+               for row in workbook[name].iter_rows()]
+        for name in workbook.sheetnames
+    }
+
+def test_streaming_xlsx_writer_matches_openpyxl_cell_for_cell(tmp_path):
+    expected = _cells(_write(ExcelReportWriter, str(tmp_path / 'openpyxl.xlsx')))
+    assert _cells(_write(StreamingXlsxReportWriter, str(tmp_path / 'xlsxwriter.xlsx'))) == expected
@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import logging
+import pstats
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is logged as a field.
+_STANDARD_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra=` fields alongside the message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname, 'logger': record.name, 'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_RECORD_FIELDS})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: str = 'INFO', fmt: str = 'text'):
+    """Sends the package's logs to stderr, as plain messages ('text') or JSON lines ('json')."""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonLogFormatter() if fmt == 'json' else logging.Formatter('%(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+class StageRecord:
+    """Measurements of one pipeline stage. `rows_in`, `rows_out` and `substages` are filled in by the caller.
+
+    `substages` maps the name of a step inside the stage to its wall seconds, for stages that time their own parts.
+    """
+    __slots__ = ('name', 'rows_in', 'rows_out', 'wall_seconds', 'cpu_seconds', 'peak_memory_mb', 'status', 'error', 'substages')
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name, self.rows_in, self.rows_out = name, rows_in, None
+        self.wall_seconds = self.cpu_seconds = self.peak_memory_mb = None
+        self.status, self.error = 'ok', None
+        self.substages: Dict[str, float] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+class _NullStage:
+    """The stage context of a disabled profiler: only remembers which stage is running, for error reports."""
+    __slots__ = ('_profiler', '_record')
+
+    def __init__(self, profiler: 'RunProfiler'):
+        self._profiler, self._record = profiler, StageRecord('')
+
+    def __enter__(self) -> StageRecord:
+        self._record.substages.clear()
+        return self._record
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self._profiler.current_stage = None
+        return False
+
+class _TimedStage:
+    __slots__ = ('_profiler', '_record', '_wall', '_cpu', '_cprofile')
+
+    def __init__(self, profiler: 'RunProfiler', name: str, rows_in: Optional[int]):
+        self._profiler, self._record, self._cprofile = profiler, StageRecord(name, rows_in), None
+
+    def __enter__(self) -> StageRecord:
+        if self._profiler.track_memory:
+            tracemalloc.reset_peak()
+        if self._record.name == self._profiler.profile_stage:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        return self._record
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        record = self._record
+        record.wall_seconds = time.perf_counter() - self._wall
+        record.cpu_seconds = time.process_time() - self._cpu
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._profiler._save_cprofile(record.name, self._cprofile)
+        if self._profiler.track_memory:
+            record.peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        if exc_type is not None:
+            record.status, record.error = 'error', f"{exc_type.__name__}: {exc}"
+        else:
+            self._profiler.current_stage = None
+        self._profiler.stages.append(record)
+        logger.info(f"Stage '{record.name}' {record.status} in {record.wall_seconds:.3f}s", extra={'stage': record.to_dict()})
+        return False
+
+class RunProfiler:
+    """Times each named pipeline stage (wall and CPU), with optional peak memory and cProfile output.
+
+    Use `with profiler.stage('fifo_matching', rows_in=n) as stage: ...; stage.rows_out = m`. When disabled,
+    `stage` returns a shared do-nothing context, so instrumented code pays almost nothing.
+    `profile_stage` names one stage to run under cProfile; its stats are written to '<profile_dir>/<stage>.prof'.
+    """
+
+    def __init__(self, enabled: bool = False, track_memory: bool = False, profile_stage: Optional[str] = None, profile_dir: str = '.'):
+        self.enabled = enabled
+        self.track_memory = enabled and track_memory
+        self.profile_stage = profile_stage
+        self.profile_dir = profile_dir
+        self.stages: List[StageRecord] = []
+        self.current_stage: Optional[str] = None
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._null_stage = _NullStage(self)
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        self.current_stage = name
+        if not self.enabled and name != self.profile_stage:
+            return self._null_stage
+        return _TimedStage(self, name, rows_in)
+
+    def _save_cprofile(self, name: str, profile: cProfile.Profile):
+        path = os.path.join(self.profile_dir, f"{name}.prof")
+        profile.dump_stats(path)
+        summary = pstats.Stats(profile, stream=_LogStream()).sort_stats('cumulative')
+        summary.print_stats(15)
+        summary.stream.flush_to(logger, f"cProfile of stage '{name}' (full stats in '{path}'):")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_wall_seconds': time.perf_counter() - self._started,
+            'memory_tracked': self.track_memory,
+            'failed_stage': next((record.name for record in self.stages if record.status == 'error'), self.current_stage),
+            'stages': [record.to_dict() for record in self.stages],
+        }
+
+    def write(self, path: str):
+        """Writes the run profile as JSON and stops memory tracing."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        if self.track_memory:
+            tracemalloc.stop()
+        logger.info(f"Run profile written to '{path}'.", extra={'run_profile': path})
+
+class _LogStream:
+    """Collects `pstats` output so it can be logged as one message."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text: str):
+        self.parts.append(text)
+
+    def flush_to(self, target: logging.Logger, heading: str):
+        target.info(heading + '\n' + ''.join(self.parts).strip('\n'))
\ No newline at end of file